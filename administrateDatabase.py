@@ -6,6 +6,15 @@ it.
 
 import psycopg2
 import logging
+from connectDatabase import open_connection
+
+
+# Statement to create the trigram index of transkribus_textregion.text.
+TEXT_INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS text_idx
+    ON transkribus_textregion
+    USING GIST (text gist_trgm_ops)
+    """
 
 
 def delete_database(dbname, user, password, host, port=5432):
@@ -227,10 +236,12 @@ def create_schema(dbname, user, password, host, port=5432):
                    )
 
     # Create index for transkribus_textregion.text.
+    cursor.execute(TEXT_INDEX_SQL)
+
+    # Create index to query the latest transcript per page.
     cursor.execute("""
-    CREATE INDEX text_idx
-    ON transkribus_textregion
-    USING GIST (text gist_trgm_ops)
+    CREATE INDEX transcript_page_timestamp_idx
+    ON transkribus_transcript (pageId, timestamp DESC)
     """
                    )
 
@@ -246,6 +257,47 @@ def create_schema(dbname, user, password, host, port=5432):
     conn.close()
 
 
+def drop_text_index(dbname, user, password, host, port=5432, conn=None):
+    """Drop the trigram index of transkribus_textregion.text.
+
+    Loading many text regions is faster without maintaining the index for
+    every inserted row. The index is recreated with create_text_index().
+
+    Args:
+        dbname (str): Name of the database.
+        user (str): Database user to connect with.
+        password (str): User password.
+        host (str): Host of the database connection.
+        port (int or str): Port of the database connection.
+        conn (connection): Open psycopg2 connection to reuse.
+
+    Returns:
+        None.
+    """
+    with open_connection(conn, dbname, user, password, host, port) as conn:
+        cursor = conn.cursor()
+        cursor.execute('DROP INDEX IF EXISTS text_idx')
+
+
+def create_text_index(dbname, user, password, host, port=5432, conn=None):
+    """Create the trigram index of transkribus_textregion.text if missing.
+
+    Args:
+        dbname (str): Name of the database.
+        user (str): Database user to connect with.
+        password (str): User password.
+        host (str): Host of the database connection.
+        port (int or str): Port of the database connection.
+        conn (connection): Open psycopg2 connection to reuse.
+
+    Returns:
+        None.
+    """
+    with open_connection(conn, dbname, user, password, host, port) as conn:
+        cursor = conn.cursor()
+        cursor.execute(TEXT_INDEX_SQL)
+
+
 def rename_database(dbname_old, dbname_new, user, password, host, port=5432):
     # Rename an existing database
 
@@ -3,25 +3,109 @@ This file contains functions to interact with the project database.
 """
 
 
+from contextlib import contextmanager
+from datetime import datetime
+import io
+import struct
+import tempfile
 from sqlalchemy import create_engine
 import psycopg2
 import logging
+import pandas as pd
 import geopandas
 
 
-def read_table(dbname, dbtable, user, password, host, port=5432):
-    # Read a PostgreSQL data table
-    
-    conn = psycopg2.connect(dbname=dbname, user=user, password=password, host=host, port=port)
-    conn.autocommit = True
-    cursor = conn.cursor()
-    cursor.execute(f'SELECT * FROM {dbtable}')
-    result = cursor.fetchall()
-    conn.close()
+@contextmanager
+def open_connection(conn, dbname, user, password, host, port=5432):
+    """Provide a connection to the database.
+
+    If an open connection is given, it is reused and the statements executed
+    within the context are committed as one transaction when leaving the
+    context. Otherwise, a new connection in autocommit mode is opened and
+    closed when leaving the context.
+
+    Args:
+        conn (connection): Open psycopg2 connection to reuse or None.
+        dbname (str): Name of the database.
+        user (str): Database user.
+        password (str): Database user password.
+        host (str): Host of the database connection.
+        port (int or str): Port of the database connection.
+
+    Yields:
+        connection: Connection to the database.
+    """
+    if conn is not None:
+        with conn:
+            yield conn
+    else:
+        conn = psycopg2.connect(dbname=dbname, user=user, password=password,
+                                host=host, port=port)
+        conn.autocommit = True
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+def read_table(dbname, dbtable, user, password, host, port=5432, conn=None):
+    # Read a PostgreSQL data table. An open connection is reused if given.
+
+    with open_connection(conn, dbname, user, password, host, port) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT * FROM {dbtable}')
+        result = cursor.fetchall()
+    return result
+
+
+def read_query(query, dbname, user, password, host, port=5432, conn=None,
+               **kwargs):
+    """Read the result of a query into a dataframe using COPY.
+
+    The result is transferred as CSV into a temporary file and parsed by
+    pandas, which avoids creating a Python tuple per row. NULL values are
+    written as \\N, hence empty strings are kept. Arrays are returned as
+    strings of their literal, e.g. "{1,2}", and can be converted by passing
+    converters.
+
+    Args:
+        query (str): SELECT statement to be executed.
+        dbname (str): Name of the database.
+        user (str): Database user.
+        password (str): Database user password.
+        host (str): Host of the database connection.
+        port (int or str): Port of the database connection.
+        conn (connection): Open psycopg2 connection to reuse.
+        **kwargs: Further arguments passed to pandas.read_csv(), e.g. names,
+        dtype or converters.
+
+    Returns:
+        DataFrame: Result of the query.
+    """
+    with tempfile.TemporaryFile() as f:
+        with open_connection(conn, dbname, user, password, host,
+                             port) as conn:
+            cursor = conn.cursor()
+            cursor.copy_expert(f"COPY ({query}) TO STDOUT "
+                               "WITH (FORMAT csv, HEADER, NULL '\\N')", f)
+            cursor.close()
+        f.seek(0)
+        result = pd.read_csv(f, keep_default_na=False, na_values=['\\N'],
+                             **kwargs)
     return result
 
 
-def read_geotable(dbname, dbtable, geom_col, user, password, host, port=5432):
+def parse_integer_array(value):
+    # Convert the literal of an integer array, e.g. "{1,2}", to a list.
+
+    value = value.strip('{}')
+    if not value:
+        return []
+    return [int(item) for item in value.split(',')]
+
+
+def read_geotable(dbname, dbtable, geom_col, user, password, host, port=5432,
+                  conn=None):
     """Read a database table containing a geometry column.
 
     Args:
@@ -32,43 +116,40 @@ def read_geotable(dbname, dbtable, geom_col, user, password, host, port=5432):
         password (str): Database user password.
         host (str): Host of the database connection.
         port (int or str): Port of the database connection.
+        conn (connection): Open psycopg2 connection to reuse.
 
     Returns:
         GeoDataFrame: Content of database table inclusive geometry.
     """
-    conn = psycopg2.connect(dbname=dbname, user=user, password=password,
-                            host=host, port=port)
-    conn.autocommit = True
     query = f'SELECT * FROM {dbtable}'
-    result = geopandas.read_postgis(query, conn, geom_col=geom_col)
-    conn.close()
+    with open_connection(conn, dbname, user, password, host, port) as conn:
+        result = geopandas.read_postgis(query, conn, geom_col=geom_col)
     return result
 
 
-def check_database_exist(dbname, user, password, host, port=5432):
-    # Check if the database exist
+def check_database_exist(dbname, user, password, host, port=5432, conn=None):
+    # Check if the database exist. An open connection to any database of the
+    # server is reused if given.
 
-    conn = psycopg2.connect(user=user, host=host, password=password, port=port)
-    conn.autocommit = True
-    cursor = conn.cursor()
-    cursor.execute('SELECT datname FROM pg_database')
-    db_list = cursor.fetchall()
-    conn.close()
+    with open_connection(conn, None, user, password, host, port) as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT datname FROM pg_database')
+        db_list = cursor.fetchall()
     if (dbname,) in db_list:
         return True
     else:
         return False
 
 
-def check_table_empty(dbname, dbtable, user, password, host, port=5432):
-    # Check if a database table is empty
-    
-    conn = psycopg2.connect(dbname=dbname, user=user, password=password, host=host, port=port)
-    conn.autocommit = True
-    cursor = conn.cursor()
-    cursor.execute(f'SELECT CASE WHEN EXISTS(SELECT 1 FROM {dbtable}) THEN 0 ELSE 1 END AS IsEmpty')
-    result = cursor.fetchall()
-    conn.close()
+def check_table_empty(dbname, dbtable, user, password, host, port=5432,
+                      conn=None):
+    # Check if a database table is empty. An open connection is reused if
+    # given.
+
+    with open_connection(conn, dbname, user, password, host, port) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT CASE WHEN EXISTS(SELECT 1 FROM {dbtable}) THEN 0 ELSE 1 END AS IsEmpty')
+        result = cursor.fetchall()
     if result[0][0] == 0:
         return False
     elif result[0][0] == 1:
@@ -77,34 +158,58 @@ def check_table_empty(dbname, dbtable, user, password, host, port=5432):
         return None
 
 
-def check_dbtable_exist(dbname, dbtable, user, password, host, port=5432):
-    # Check if the dbtable exist.
+def check_tables_empty(dbname, dbtables, user, password, host, port=5432,
+                       conn=None):
+    """Check for several database tables if they are empty.
 
-    conn = psycopg2.connect(dbname=dbname, user=user, password=password,
-                            host=host, port=port
-                            )
-    conn.autocommit = True
-    cursor = conn.cursor()
-    cursor.execute(f"""
-        SELECT EXISTS (SELECT 1
-        FROM information_schema.tables
-        WHERE table_schema = 'public'
-        AND table_name  = '{dbtable}')"""
-                   )
-    result = cursor.fetchall()
-    conn.close()
+    The tables are checked with a single query.
+
+    Args:
+        dbname (str): Name of the database.
+        dbtables (list): Names of the database tables.
+        user (str): Database user.
+        password (str): Database user password.
+        host (str): Host of the database connection.
+        port (int or str): Port of the database connection.
+        conn (connection): Open psycopg2 connection to reuse.
+
+    Returns:
+        dict: Indicator per database table if the table is empty.
+    """
+    subqueries = ', '.join(f'NOT EXISTS(SELECT 1 FROM {dbtable})'
+                           for dbtable in dbtables)
+    with open_connection(conn, dbname, user, password, host, port) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT {subqueries}')
+        result = cursor.fetchone()
+    return dict(zip(dbtables, result))
+
+
+def check_dbtable_exist(dbname, dbtable, user, password, host, port=5432,
+                        conn=None):
+    # Check if the dbtable exist. An open connection is reused if given.
+
+    with open_connection(conn, dbname, user, password, host, port) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT EXISTS (SELECT 1
+            FROM information_schema.tables
+            WHERE table_schema = 'public'
+            AND table_name  = '{dbtable}')"""
+                       )
+        result = cursor.fetchall()
     return result[0][0]
 
 
-def populate_table(df, dbname, dbtable, user, password, host, port=5432, info=True):
-    # Write a dataframe to a PostgreSQL data table
-    
-    url = f'postgresql://{user}:{password}@{host}:{port}/{dbname}'
-    engine = create_engine(url)
+def populate_table(df, dbname, dbtable, user, password, host, port=5432,
+                   info=True, conn=None):
+    # Write a dataframe to a PostgreSQL data table. If an open connection is
+    # given, the rows are streamed with COPY using this connection.
 
     if info:
         # Check if database table is empty
-        table_empty = check_table_empty(dbname, dbtable, user, password, host, port)
+        table_empty = check_table_empty(dbname, dbtable, user, password, host,
+                                        port, conn=conn)
         if not table_empty:
             logging.warning(f'The table {dbtable} of database {dbname} is not empty.')
 
@@ -113,7 +218,183 @@ def populate_table(df, dbname, dbtable, user, password, host, port=5432, info=Tr
     df.columns = df.columns.str.lower()
 
     # Write dataframe to database table
-    df.to_sql(dbtable, con=engine, if_exists='append', index=False)
+    if conn is not None:
+        # Convert the values to python objects and missing values to None.
+        rows = df.astype(object).where(df.notna(), None)
+        with conn:
+            copy_rows(conn, dbtable, df.columns,
+                      rows.itertuples(index=False, name=None))
+    else:
+        url = f'postgresql://{user}:{password}@{host}:{port}/{dbname}'
+        engine = create_engine(url)
+        df.to_sql(dbtable, con=engine, if_exists='append', index=False)
+
+
+# Characters to be escaped in the text format of COPY.
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n',
+                              '\r': '\\r'})
+
+
+def format_copy_value(value):
+    """Format a value according the text format of COPY.
+
+    Lists are formatted as array literals. Floats without decimal places are
+    formatted as integers, since integer columns containing missing values
+    are represented as floats in pandas.
+
+    Args:
+        value: Value to be formatted.
+
+    Returns:
+        str: Value as it is written to COPY.
+    """
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime):
+        value = value.isoformat(sep=' ')
+    elif isinstance(value, (list, tuple)):
+        items = []
+        for item in value:
+            if item is None:
+                items.append('NULL')
+            else:
+                item = str(item).replace('\\', '\\\\').replace('"', '\\"')
+                items.append(f'"{item}"')
+        value = '{' + ','.join(items) + '}'
+    return str(value).translate(COPY_ESCAPES)
+
+
+class CopyReader:
+    """File-like object providing rows in the text format of COPY.
+
+    A row is formatted only when the next chunk is read, hence the rows are
+    streamed to the database without building the whole content in memory.
+    """
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = ''
+
+    def read(self, size=-1):
+        # Format rows until the requested size is available.
+        while size < 0 or len(self.buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.buffer += '\t'.join(
+                format_copy_value(value) for value in row) + '\n'
+        if size < 0:
+            chunk, self.buffer = self.buffer, ''
+        else:
+            chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+
+def copy_rows(conn, dbtable, columns, rows):
+    """Write rows into a database table using COPY.
+
+    The rows are streamed to the database. The transaction is not committed
+    by this function.
+
+    Args:
+        conn (connection): Open psycopg2 connection to the database.
+        dbtable (str): Name of the database table.
+        columns (list): Names of the columns to be written.
+        rows (iterable): Rows to be written as tuples ordered like columns.
+
+    Returns:
+        None.
+    """
+    cursor = conn.cursor()
+    cursor.copy_expert(f'COPY {dbtable} ({", ".join(columns)}) FROM STDIN',
+                       CopyReader(rows))
+    cursor.close()
+
+
+# Header and trailer of the binary format of COPY.
+COPY_BINARY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+COPY_BINARY_TRAILER = struct.pack('!h', -1)
+
+# Struct formats of the binary representation of integer types.
+COPY_BINARY_FORMATS = {'smallint': '!h', 'integer': '!i', 'bigint': '!q'}
+
+
+def copy_rows_binary(conn, dbtable, columns, types, rows):
+    """Write rows into a database table using the binary format of COPY.
+
+    Integers are sent in their binary representation, hence they neither have
+    to be formatted on the client nor parsed on the server.
+
+    Args:
+        conn (connection): Open psycopg2 connection to the database.
+        dbtable (str): Name of the database table.
+        columns (list): Names of the columns to be written.
+        types (list): Type of each column, either 'smallint', 'integer',
+        'bigint' or 'text'. Columns of type 'text' are used for all character
+        types.
+        rows (iterable): Rows to be written as tuples ordered like columns.
+
+    Returns:
+        None.
+    """
+    formats = [COPY_BINARY_FORMATS.get(column_type) for column_type in types]
+    field_count = struct.pack('!h', len(columns))
+    data = io.BytesIO()
+    data.write(COPY_BINARY_HEADER)
+    for row in rows:
+        data.write(field_count)
+        for value, value_format in zip(row, formats):
+            if value is None:
+                data.write(struct.pack('!i', -1))
+                continue
+            if value_format:
+                field = struct.pack(value_format, value)
+            else:
+                field = str(value).encode('utf-8')
+            data.write(struct.pack('!i', len(field)))
+            data.write(field)
+    data.write(COPY_BINARY_TRAILER)
+    data.seek(0)
+
+    cursor = conn.cursor()
+    cursor.copy_expert(f'COPY {dbtable} ({", ".join(columns)}) FROM STDIN '
+                       'WITH (FORMAT binary)', data)
+    cursor.close()
+
+
+def copy_table(conn_source, conn_destination, dbtable, columns):
+    """Copy the content of a database table to another database using COPY.
+
+    The rows are exported from the source database to a temporary file and
+    imported from this file into the same table of the destination database.
+    The transaction of the destination database is not committed by this
+    function.
+
+    Args:
+        conn_source (connection): Open psycopg2 connection to the database
+        to copy from.
+        conn_destination (connection): Open psycopg2 connection to the
+        database to copy to.
+        dbtable (str): Name of the database table.
+        columns (list): Names of the columns to be copied.
+
+    Returns:
+        None.
+    """
+    columns = ', '.join(columns)
+    with tempfile.TemporaryFile() as f:
+        cursor = conn_source.cursor()
+        cursor.copy_expert(f'COPY (SELECT {columns} FROM {dbtable}) TO STDOUT',
+                           f)
+        cursor.close()
+        f.seek(0)
+        cursor = conn_destination.cursor()
+        cursor.copy_expert(f'COPY {dbtable} ({columns}) FROM STDIN', f)
+        cursor.close()
 
 
 def populate_geotable(df, dbname, dbtable, user, password, host, port=5432,
@@ -29,12 +29,13 @@ Each fulfilled condition is documented in the note_postprocessing column.
 """
 
 
+import psycopg2
 import pandas as pd
+import numpy as np
 import re
-import math
 from datetime import datetime
 
-from connectDatabase import read_table, read_geotable
+from connectDatabase import read_table, read_query, read_geotable
 
 
 # Set parameters for postgresql database.
@@ -65,11 +66,13 @@ def main():
     db_host = input('PostgreSQL host:')
     db_port = input('PostgreSQL database port:')
 
-    # Read necessary database tables.
+    # Read necessary database tables using one connection.
+    conn = psycopg2.connect(dbname=DB_NAME, user=db_user,
+                            password=db_password, host=db_host, port=db_port)
     stabs_dossier = pd.DataFrame(
         read_table(dbname=DB_NAME, dbtable='stabs_dossier',
                    user=db_user, password=db_password,
-                   host=db_host, port=db_port),
+                   host=db_host, port=db_port, conn=conn),
         columns=['dossierId', 'serieId', 'stabsId', 'title', 'link',
                  'houseName', 'oldHousenumber', 'owner1862', 'descriptiveNote'
                  ])
@@ -77,21 +80,19 @@ def main():
         dbname=DB_NAME,
         dbtable='project_dossier', geom_col='location',
         user=db_user, password=db_password,
-        host=db_host, port=db_port
+        host=db_host, port=db_port, conn=conn
         )
-    project_entry = pd.DataFrame(
-        read_table(dbname=DB_NAME, dbtable='project_entry',
-                   user=db_user, password=db_password,
-                   host=db_host, port=db_port),
-        columns=['entryId', 'dossierId', 'pageId',
-                 'year', 'yearSource',
-                 'comment', 'manuallyCorrected',
-                 'language'])
-    project_relationship = pd.DataFrame(
-        read_table(dbname=DB_NAME, dbtable='project_relationship',
-                   user=db_user, password=db_password,
-                   host=db_host, port=db_port),
-        columns=['sourceDossierId', 'targetDossierId'])
+    project_entry = read_query(
+        'SELECT dossierid, year FROM project_entry',
+        dbname=DB_NAME, user=db_user, password=db_password,
+        host=db_host, port=db_port, conn=conn,
+        names=['dossierId', 'year'], header=0, dtype={'year': 'float64'})
+    project_relationship = read_query(
+        'SELECT sourcedossierid, targetdossierid FROM project_relationship',
+        dbname=DB_NAME, user=db_user, password=db_password,
+        host=db_host, port=db_port, conn=conn,
+        names=['sourceDossierId', 'targetDossierId'], header=0)
+    conn.close()
 
     # Merge the two tables.
     dossier = stabs_dossier.merge(
@@ -159,38 +160,36 @@ def main():
             FILEPATH_RESULT + current_date + '_' + FILENAME_NOTEANALYSIS,
             index=False, header=True)
 
-    # Determine year based on min/max year entry.
-    dossier['yearfromSource'] = None
-    dossier['yeartoSource'] = None
-    for index, row in dossier.iterrows():
-        entry_selected = project_entry[
-            project_entry['dossierId'] == row['dossierId']]
-
-        # Get minimal year if not already yearfrom determined from metadata.
-        if math.isnan(row['yearfrom1']):
-            if not math.isnan(entry_selected['year'].min()):
-                dossier.at[index, 'yearfrom1'] = entry_selected['year'].min()
-                dossier.at[index, 'yearfromSource'] = 'project_entry.year'
-        else:
-            dossier.at[
-                index, 'yearfromSource'] = 'stabs_dossier.descriptiveNote'
-
-        # Get maximal year if not already yearto determined from metadata.
-        if math.isnan(row['yearto1']):
-            if not math.isnan(entry_selected['year'].max()):
-                dossier.at[index, 'yearto1'] = entry_selected['year'].max()
-                dossier.at[index, 'yeartoSource'] = 'project_entry.year'
-        else:
-            dossier.at[index, 'yeartoSource'] = 'stabs_dossier.descriptiveNote'
+    # Determine year based on min/max year entry if not already yearfrom or
+    # yearto determined from metadata.
+    year_by_dossier = project_entry.groupby('dossierId')['year']
+    year_min = dossier['dossierId'].map(year_by_dossier.min())
+    year_max = dossier['dossierId'].map(year_by_dossier.max())
+    yearfrom_missing = dossier['yearfrom1'].isna()
+    yearto_missing = dossier['yearto1'].isna()
+    dossier['yearfromSource'] = np.select(
+        [~yearfrom_missing, year_min.notna()],
+        ['stabs_dossier.descriptiveNote', 'project_entry.year'],
+        default=None)
+    dossier['yeartoSource'] = np.select(
+        [~yearto_missing, year_max.notna()],
+        ['stabs_dossier.descriptiveNote', 'project_entry.year'],
+        default=None)
+    dossier['yearfrom1'] = dossier['yearfrom1'].fillna(year_min)
+    dossier['yearto1'] = dossier['yearto1'].fillna(year_max)
 
     # Read including dossier.
     including_dossier = pd.read_csv(FILENAME_INCLUDINGDOSSIER)
 
     # Analysis of the years.
-    dossier['note_postprocessing'] = ''
-    for index, row in dossier.iterrows():
-        if math.isnan(row['yearfrom1']) or math.isnan(row['yearto1']):
-            dossier.at[index, 'note_postprocessing'] += 'Year is missing.\n'
+    # The notes are collected per dossier and assigned to the column at once.
+    notes = []
+    year_missing = (dossier['yearfrom1'].isna()
+                    | dossier['yearto1'].isna()).to_numpy()
+    for (_, row), missing in zip(dossier.iterrows(), year_missing):
+        note = ''
+        if missing:
+            note += 'Year is missing.\n'
         else:
             previous_dossier = project_relationship[
                 project_relationship['targetDossierId'] == row['dossierId']]
@@ -231,26 +230,20 @@ def main():
                     # Check if yearto of previous dossier is larger than
                     # yearfrom1.
                     if yearto > row['yearfrom1']:
-                        dossier.at[
-                            index,
-                            'note_postprocessing'
-                            ] += (
-                                f'yearto {int(yearto)} of preceding dossier '
-                                f'{dossierid_previous} is larger than '
-                                f"yearfrom1 {int(row['yearfrom1'])}.\n")
+                        note += (
+                            f'yearto {int(yearto)} of preceding dossier '
+                            f'{dossierid_previous} is larger than '
+                            f"yearfrom1 {int(row['yearfrom1'])}.\n")
 
                     # Check if the difference of yearto of previous dossier
                     # and yearfrom1 is larger than 40 years.
                     elif yearto + 40 < row['yearfrom1']:
-                        dossier.at[
-                            index,
-                            'note_postprocessing'
-                            ] += (
-                                f'The difference between yearto {int(yearto)} '
-                                'of the preceding dossier '
-                                f'{dossierid_previous} and yearfrom1 '
-                                f"{int(row['yearfrom1'])} is more than 40 "
-                                'years.\n')
+                        note += (
+                            f'The difference between yearto {int(yearto)} '
+                            'of the preceding dossier '
+                            f'{dossierid_previous} and yearfrom1 '
+                            f"{int(row['yearfrom1'])} is more than 40 "
+                            'years.\n')
 
             # Compare dossier with following dossiers.
             if not following_dossier.empty:
@@ -286,26 +279,20 @@ def main():
                     # Check if yearfrom of following dossier is smaller than
                     # yearto1.
                     if yearfrom < row['yearto1']:
-                        dossier.at[
-                            index,
-                            'note_postprocessing'
-                            ] += (
-                                f'yearfrom {int(yearfrom)} of following '
-                                f'dossier {dossierid_following} is smaller '
-                                f"than yearto1 {int(row['yearto1'])}.\n")
+                        note += (
+                            f'yearfrom {int(yearfrom)} of following '
+                            f'dossier {dossierid_following} is smaller '
+                            f"than yearto1 {int(row['yearto1'])}.\n")
 
                     # Check if the difference of yearto1 and yearfrom of the
                     # following dossier is larger than 40 years.
                     elif row['yearto1'] + 40 < yearfrom:
-                        dossier.at[
-                            index,
-                            'note_postprocessing'
-                            ] += (
-                                'The difference between yearto1 '
-                                f"{int(row['yearto1'])} and yearfrom "
-                                f'{int(yearfrom)} of the following dossier '
-                                f'{dossierid_following} is more than 40 years.'
-                                '\n')
+                        note += (
+                            'The difference between yearto1 '
+                            f"{int(row['yearto1'])} and yearfrom "
+                            f'{int(yearfrom)} of the following dossier '
+                            f'{dossierid_following} is more than 40 years.'
+                            '\n')
 
             # Test whether previous dossier is also following dossier.
             prevandfollow_dossier = pd.merge(previous_dossier,
@@ -317,11 +304,10 @@ def main():
                 prevandfollow_string = ', '.join(
                     prevandfollow_dossier['sourceDossierId_x'].astype(str)
                     )
-                dossier.at[
-                    index,
-                    'note_postprocessing'
-                    ] += ('The following dossier is/are also subsequent '
-                          f'dossier: {prevandfollow_string}.\n')
+                note += ('The following dossier is/are also subsequent '
+                         f'dossier: {prevandfollow_string}.\n')
+        notes.append(note)
+    dossier['note_postprocessing'] = notes
 
     # Add additional columns for the postpocessing.
     dossier['yearfrom1_new'] = None
@@ -42,12 +42,19 @@ table is created instead of a view.
 import logging
 from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import psycopg2
 import pandas as pd
-import xml.etree.ElementTree as et
+import numpy as np
+from lxml import etree as et
 import re
 import os
+import shutil
+import hashlib
 import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import math
 import geopandas
 from lingua import Language, LanguageDetectorBuilder
@@ -56,10 +63,11 @@ from shapely import wkt
 
 from administrateDatabase import (
     delete_database, create_database, create_schema, rename_database,
-    copy_database, remove_privileges)
+    copy_database, remove_privileges, drop_text_index, create_text_index)
 from connectDatabase import (populate_table, read_table, check_database_exist,
-                             check_table_empty, check_dbtable_exist,
-                             read_geotable, populate_geotable)
+                             check_tables_empty, check_dbtable_exist,
+                             read_geotable, populate_geotable, copy_rows,
+                             copy_rows_binary, copy_table, open_connection)
 
 
 # Set directory of logfile.
@@ -73,6 +81,8 @@ DB_HOST = 'localhost'
 # Set filepaths for HGB metadata.
 FILEPATH_SERIE = './data/stabs_serie.csv'
 FILEPATH_DOSSIER = './data/stabs_dossier.csv'
+FILEPATH_SERIE_PARQUET = './data/stabs_serie.parquet'
+FILEPATH_DOSSIER_PARQUET = './data/stabs_dossier.parquet'
 
 # Set parameter for geodata to be imported.
 SHAPEFILE_PATH = 'data/HGB_Mappen_Liste_Staatsarchiv.shp'
@@ -119,6 +129,41 @@ FILEPATH_PROJECT_RELATIONSHIP = './data/20241103_dossier_relationship.csv'
 # Define direction of the backup file.
 BACKUP_DIR = '/mnt/research-storage/Projekt_HGB/DB_Dump/hgb'
 
+# Define the HTTP session reusing its connections for all requests.
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=32, pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3,
+                      status_forcelist=[500, 502, 503, 504])))
+
+# Define directory in which queried Transkribus page xml are cached while
+# processing the Transkribus data. The directory is removed after a successful
+# run.
+PAGE_XML_CACHE_DIR = './data/page_xml_cache'
+
+# Define the namespace of the Transkribus page xml and the compiled XPath
+# expressions to query its elements.
+PAGE_NS = {'p': 'http://schema.primaresearch.org/PAGE/gts/pagecontent/'
+                '2013-07-15'}
+CREATOR_XPATH = et.XPath('.//p:Creator/text()', namespaces=PAGE_NS)
+TEXTREGION_XPATH = et.XPath('.//p:TextRegion', namespaces=PAGE_NS)
+TEXTLINE_XPATH = et.XPath('.//p:TextLine', namespaces=PAGE_NS)
+UNICODE_XPATH = et.XPath('.//p:Unicode', namespaces=PAGE_NS)
+POINTS_XPATH = et.XPath('.//p:Coords/@points', namespaces=PAGE_NS)
+
+# Define the patterns of the custom attribute of the text regions.
+INDEX_RE = re.compile(r'index:(\d+);')
+TYPE_RE = re.compile(r'type:([a-z]+);')
+
+# Define the patterns to analyse the text of the text regions.
+ZINS_RE = re.compile(r'[Zz][iü]n[n]?s')
+SPECIAL_CHARACTER_RE = re.compile(r'[^\w\säöü]')
+
+# Define the patterns of the validity range in the dossier descriptive note.
+VALIDITY_FROM_RE = re.compile(r'^((Seit)|(Errichtet)|(Ab)) 1[0-9]{3}\.')
+VALIDITY_TO_RE = re.compile(r'((Bis)|(Abgebrochen)) 1[0-9]{3}\.')
+VALIDITY_RANGE_RE = re.compile(r'^1[0-9]{3}-1[0-9]{3}\.?$')
+
 
 def download_script(url):
     """Download a online file to current working directory.
@@ -133,23 +178,25 @@ def download_script(url):
         ValueError: Request status code is not ok.
     """
     filename = url.split('/')[-1]
-    r = requests.get(url)
+    r = SESSION.get(url, timeout=30, stream=True)
     if r.status_code == requests.codes.ok:
-        with open(filename, 'w') as f:
-            f.write(r.text)
+        with open(filename, 'wb') as f:
+            for chunk in r.iter_content(chunk_size=8192):
+                f.write(chunk)
     else:
         logging.error(f'url invalid? {r}')
         raise ValueError(f'Request status code is not ok: {r}.')
 
 
 # Download and import necessary functions from other github repositories.
-download_script(URI_QUERY_METADATA)
-download_script(URI_CONNECT_TRANSKRIBUS)
+with ThreadPoolExecutor(max_workers=2) as executor:
+    list(executor.map(download_script,
+                      [URI_QUERY_METADATA, URI_CONNECT_TRANSKRIBUS]))
 from queryMetadata import (query_series, get_series, get_serie_id,
                            get_dossiers, get_dossier_id,
                            query_documents, get_date)
 from connect_transkribus import (get_sid, list_collections, list_documents,
-                                 get_document_content, get_page_xml)
+                                 get_document_content)
 
 
 def do_process(prompt: str) -> bool:
@@ -171,14 +218,64 @@ def do_process(prompt: str) -> bool:
         return do_process(f'Your answer is not True or False: {r}. {prompt}')
 
 
-def processing_stabs(filepath_serie, filepath_dossier, dbname,
-                     db_user, db_password,
-                     db_host, db_port=5432):
+def fetch_page_xml(url, sid, cache_dir=PAGE_XML_CACHE_DIR):
+    """Query a Transkribus page xml using a cache on disk.
+
+    The page xml of a transcript does not change, hence it is stored in the
+    cache directory with the SHA-1 hash of its url as filename. When the
+    script is rerun after a failure, cached page xml are read from disk
+    instead of being queried again. The cache is only kept until the
+    Transkribus data are processed successfully, see processing_transkribus().
+
+    Args:
+        url (str): Url of the page xml.
+        sid (str): Transkribus session id.
+        cache_dir (str): Directory of the cached page xml. If None, the page
+        xml is queried without cache.
+
+    Returns:
+        bytes: Content of the page xml as received.
+
+    Raises:
+        ValueError: Request status code is not ok.
+    """
+    if cache_dir is not None:
+        filepath = os.path.join(
+            cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.xml')
+        if os.path.exists(filepath):
+            with open(filepath, 'rb') as f:
+                return f.read()
+
+    # Query the page xml using the connections of the HTTP session.
+    r = SESSION.get(url, cookies={'JSESSIONID': sid}, timeout=30)
+    if r.status_code != requests.codes.ok:
+        logging.error(f'Page xml not available: {url}, {r}')
+        raise ValueError(f'Request status code is not ok: {r}.')
+    page_xml = r.content
+    if cache_dir is None:
+        return page_xml
+
+    # Write to a temporary file first to not leave an incomplete page xml in
+    # the cache if the script is interrupted. The name of the temporary file
+    # is unique per thread.
+    os.makedirs(cache_dir, exist_ok=True)
+    filepath_tmp = f'{filepath}.{threading.get_ident()}.tmp'
+    with open(filepath_tmp, 'wb') as f:
+        f.write(page_xml)
+    os.replace(filepath_tmp, filepath)
+    return page_xml
+
+
+def processing_stabs(filepath_serie, filepath_dossier,
+                     filepath_serie_parquet, filepath_dossier_parquet,
+                     dbname, db_user, db_password,
+                     db_host, db_port=5432, conn=None):
     """Process metadata of the State Archives of Basel.
 
     This function processes all series and dossiers of the Historical Land
     Registry (HGB) and write them to the project database. In addition, CSV
-    files thereof will be written.
+    and Parquet files thereof will be written. The Parquet files preserve the
+    data types and are read when processing the Transkribus data.
     Furthermore, metadata of the documents containing in the Serie "Regesten
     Klingental" are queried and stored in the database.
 
@@ -186,14 +283,20 @@ def processing_stabs(filepath_serie, filepath_dossier, dbname,
         filepath_serie (str): Filepath of destination csv containing series.
         filepath_dossier (str): Filepath of destination csv containing
         dossiers.
+        filepath_serie_parquet (str): Filepath of destination parquet file
+        containing series.
+        filepath_dossier_parquet (str): Filepath of destination parquet file
+        containing dossiers.
         dbname (str): Name of the destination database.
         db_user (str): User of the database connection.
         db_password (str): Password for the database connection.
         db_host (str): Host of the database connection.
         db_port (str): Port of the database connection.
+        conn (connection): Open connection to the destination database.
 
     Returns:
-        None.
+        DataFrame: Series of the HGB.
+        DataFrame: Dossiers of the HGB.
     """
     # Query all series.
     logging.info('Query series...')
@@ -204,70 +307,75 @@ def processing_stabs(filepath_serie, filepath_dossier, dbname,
     series_data = get_series(series_data)
 
     # Generate the "project_id" of the series.
-    series_data['serieId'] = series_data.apply(
-        lambda row: get_serie_id(row['stabsId']), axis=1
-        )
+    series_data['serieId'] = series_data['stabsId'].map(get_serie_id)
 
     # Get all dossiers from all series.
-    all_dossiers = pd.DataFrame(
-        columns=['dossierId', 'title', 'houseName', 'oldHousenumber',
-                 'owner1862', 'descriptiveNote', 'link'
-                 ])
-    for row in series_data.iterrows():
-        logging.info('Query dossier %s ...', row[1]['link'])
-        dossiers = get_dossiers(row[1]['link'])
+    dossier_frames = []
+    for row in series_data.itertuples(index=False):
+        logging.info('Query dossier %s ...', row.link)
+        dossiers = get_dossiers(row.link)
 
         # Case if serie does not have any dossier.
         if not isinstance(dossiers, pd.DataFrame):
             continue
         else:
             # Add series_id to dossiers.
-            dossiers['serieId'] = row[1]['serieId']
+            dossier_frames.append(dossiers.assign(serieId=row.serieId))
 
-            all_dossiers = pd.concat([all_dossiers, dossiers],
-                                     ignore_index=True
-                                     )
+    # Concatenate the dossiers of all series at once.
+    if dossier_frames:
+        all_dossiers = pd.concat(dossier_frames, ignore_index=True)
+    else:
+        all_dossiers = pd.DataFrame(
+            columns=['stabsId', 'title', 'houseName', 'oldHousenumber',
+                     'owner1862', 'descriptiveNote', 'link', 'serieId'
+                     ])
 
     # Generate the "project_id" of the dossiers.
-    all_dossiers['dossierId'] = all_dossiers.apply(
-        lambda row: get_dossier_id(row['stabsId']), axis=1)
+    all_dossiers['dossierId'] = all_dossiers['stabsId'].map(get_dossier_id)
     logging.info('Dossiers queried.')
 
     # Write data created to project database.
     populate_table(df=series_data, dbname=dbname, dbtable='stabs_serie',
                    user=db_user, password=db_password,
-                   host=db_host, port=db_port
+                   host=db_host, port=db_port, conn=conn
                    )
     populate_table(df=all_dossiers, dbname=dbname, dbtable='stabs_dossier',
                    user=db_user, password=db_password,
-                   host=db_host, port=db_port)
+                   host=db_host, port=db_port, conn=conn)
 
-    # Write data created to csv.
+    # Write data created to csv and parquet.
     series_data.to_csv(filepath_serie, index=False, header=True)
     all_dossiers.to_csv(filepath_dossier, index=False, header=True)
+    series_data.to_parquet(filepath_serie_parquet, index=False,
+                           compression='zstd')
+    all_dossiers.to_parquet(filepath_dossier_parquet, index=False,
+                            compression='zstd')
 
     # Get and write documents of the serie "Regesten Klingental".
     logging.info('Query Klingental regest...')
     url_klingental_regest = 'https://ld.bs.ch/ais/Record/751516'
     klingental_regest = pd.DataFrame(query_documents(url_klingental_regest))
-    klingental_regest['expresseddate'] = klingental_regest.apply(
-        lambda row: get_date(row['isassociatedwithdate']), axis=1
-        )
+    klingental_regest['expresseddate'] = klingental_regest[
+        'isassociatedwithdate'].map(get_date)
     klingental_regest = klingental_regest.drop(
         ['isassociatedwithdate', 'type'], axis=1
         )
     populate_table(df=klingental_regest, dbname=dbname,
                    dbtable='stabs_klingental_regest',
                    user=db_user, password=db_password,
-                   host=db_host, port=db_port
+                   host=db_host, port=db_port, conn=conn
                    )
     logging.info('Klingental regest queried.')
 
+    return series_data, all_dossiers
+
 
 def processing_transkribus(series_data, dossiers_data, dbname,
                            db_user, db_password,
                            db_host, db_port=5432,
-                           correct_line_order=False):
+                           correct_line_order=False, batch_size=1000,
+                           max_workers=8, cache_dir=PAGE_XML_CACHE_DIR):
     """Processes the metadata of the HGB.
 
     This function processes all project database tables containing data from
@@ -285,6 +393,12 @@ def processing_transkribus(series_data, dossiers_data, dbname,
         db_host (str): Host of the database connection.
         db_port (str): Port of the database connection.
         correct_line_order (bool): Define if text line order will be corrected.
+        batch_size (int): Number of rows of a table from which on the
+        buffered documents are written to the database.
+        max_workers (int): Number of threads querying the page xml.
+        cache_dir (str): Directory in which the queried page xml are cached
+        until all documents are processed, so that a rerun after a failure
+        does not query them again. If None, no cache is used.
 
     Returns:
         None.
@@ -294,138 +408,181 @@ def processing_transkribus(series_data, dossiers_data, dbname,
     password = input('Transkribus password:')
     sid = get_sid(user, password)
 
-    # Check if collections already exist in project database.
-    coll = pd.DataFrame(
-        read_table(dbname=dbname, dbtable='transkribus_collection',
-                   user=db_user, password=db_password,
-                   host=db_host, port=db_port),
-        columns=['colId', 'colName', 'nrOfDocuments'])
-    if len(coll) > 0:
-        logging.warning('Collections already exist in the projct database. '
-                        'Only those collections will be considered further.')
-    else:
-        # Read the transkribus collections and write those in project database.
+    # Open one connection to the project database used for all reads and
+    # writes.
+    conn = psycopg2.connect(dbname=dbname,
+                            user=db_user, password=db_password,
+                            host=db_host, port=db_port
+                            )
+    try:
+        # Check if collections already exist in project database.
+        coll = pd.DataFrame(
+            read_table(dbname=dbname, dbtable='transkribus_collection',
+                       user=db_user, password=db_password,
+                       host=db_host, port=db_port, conn=conn),
+            columns=['colId', 'colName', 'nrOfDocuments'])
+        if len(coll) > 0:
+            logging.warning('Collections already exist in the projct '
+                            'database. Only those collections will be '
+                            'considered further.')
+        else:
+            # Read the transkribus collections and write those in project
+            # database.
+
+            # Get all collections.
+            coll = pd.DataFrame(list_collections(sid))
+
+            # Test if collections and series are one-to-one-connected.
+            if not (coll['colName'].is_unique
+                    and series_data['serieId'].is_unique):
+                raise pd.errors.MergeError(
+                    'Transkribus collections and series are not one-to-one '
+                    'connected.')
+
+            # Analyse which collections where skipped.
+            coll_available = coll['colName'].isin(series_data['serieId'])
+            log_skipped = coll.loc[~coll_available, 'colName'].values
+            logging.warning('The following Transkribus collection where '
+                            f'skipped: {log_skipped}. They are not available '
+                            'in table stabs_serie.'
+                            )
 
-        # Get all collections.
-        coll = pd.DataFrame(list_collections(sid))
+            # Analyse which collections are missing.
+            log_missing = series_data.loc[
+                ~series_data['serieId'].isin(coll['colName']), 'title'].values
+            logging.info('For the following series, no Transkribus '
+                         f'collection are available: {log_missing}.')
+
+            # Keep only collection features available in stabs_serie data and
+            # columns according project database schema.
+            coll = coll.loc[coll_available,
+                            ['colId', 'colName', 'nrOfDocuments']]
+
+            # Write collections to database.
+            populate_table(df=coll, dbname=dbname,
+                           dbtable='transkribus_collection',
+                           user=db_user, password=db_password,
+                           host=db_host, port=db_port, conn=conn
+                           )
 
-        # Analyse which collections where skipped.
-        test = coll.merge(series_data, how='left',
-                          left_on='colName', right_on='serieId',
-                          indicator=True
-                          )
-        log_skipped = test.query("_merge == 'left_only'")['colName'].values
-        logging.warning('The following Transkribus collection where skipped: '
-                        f'{log_skipped}. They are not available in table '
-                        'stabs_serie.'
-                        )
+        # Get documents according project database schema for each collection
+        # considered.
+        doc_rows = []
+        for row in coll.itertuples(index=False):
+            logging.info(f'Query documents of collection {row.colName}...')
+            doc_return = list_documents(sid, row.colId)
+            for doc in doc_return:
+                doc_rows.append(
+                    {'docId': doc['docId'],
+                     'colId': doc['collectionList']['colList'][0]['colId'],
+                     'title': doc['title'], 'nrOfPages': doc['nrOfPages']})
+        all_doc = pd.DataFrame(
+            doc_rows, columns=['docId', 'colId', 'title', 'nrOfPages'])
+        n_documents = len(all_doc)
+
+        # Analyse which documents where skipped.
+        log_skipped = all_doc.loc[
+            ~all_doc['title'].isin(dossiers_data['dossierId']), 'title'].values
+        logging.info('The following Transkribus document are not available in '
+                     f'table stabs_dossier: {log_skipped}.')
+
+        # Analyse which documents are missing.
+        log_missing = dossiers_data.loc[
+            ~dossiers_data['dossierId'].isin(all_doc['title']), 'title'].values
+        logging.info('The following Transkribus document where skipped: '
+                     f'{log_missing}.')
+
+        # Test if documents and dossiers are one-to-one-connected.
+        if not (all_doc['title'].is_unique
+                and dossiers_data['dossierId'].is_unique):
+            raise pd.errors.MergeError(
+                'Transkribus documents and dossiers are not one-to-one '
+                'connected.')
+
+        # Check if documents already exist in project database.
+        transkribus_docs = pd.DataFrame(
+            read_table(dbname=dbname, dbtable='transkribus_document',
+                       user=db_user, password=db_password,
+                       host=db_host, port=db_port, conn=conn),
+            columns=['docId', 'colId', 'title', 'nrOfPages'])
+        if len(transkribus_docs) > 0:
+            last_document = transkribus_docs.iloc[-1]['title']
+            logging.info('Documents already exist in the projct database. '
+                         'Processing the subsequent documents of document '
+                         f'{last_document}.')
+
+            # Skip documents that are already processed.
+            last_document_index = all_doc[
+                all_doc['title'] == last_document].index.item()
+            all_doc = all_doc.iloc[last_document_index + 1:]
+
+        # Iterate over documents using a pool of threads querying the page
+        # xml.
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            process_transkribus_documents(
+                all_doc, n_documents, sid, conn, executor,
+                correct_line_order=correct_line_order,
+                batch_size=batch_size, cache_dir=cache_dir)
+    finally:
+        conn.close()
 
-        # Analyse which collections are missing.
-        test = coll.merge(series_data, how='right',
-                          left_on='colName', right_on='serieId',
-                          indicator=True
-                          )
-        log_missing = test.query("_merge == 'right_only'")['title'].values
-        logging.info('For the following series, no Transkribus collection are '
-                     f'available: {log_missing}.')
-
-        # Keep only collection features available in stabs_serie data.
-        coll = pd.merge(coll, series_data, how='inner',
-                        left_on='colName', right_on='serieId',
-                        validate='one_to_one'
-                        )
+    # All page xml are processed, hence the cache is not needed anymore.
+    if cache_dir is not None:
+        shutil.rmtree(cache_dir, ignore_errors=True)
 
-        # Keep columns according project database schema.
-        coll = coll[['colId', 'colName', 'nrOfDocuments']]
 
-        # Write collections to database.
-        populate_table(df=coll, dbname=dbname,
-                       dbtable='transkribus_collection',
-                       user=db_user, password=db_password,
-                       host=db_host, port=db_port
-                       )
+def process_transkribus_documents(all_doc, n_documents, sid, conn, executor,
+                                  correct_line_order=False, batch_size=1000,
+                                  cache_dir=PAGE_XML_CACHE_DIR):
+    """Process the Transkribus documents and write them to the database.
 
-    # Get documents according project database schema for each collection
-    # considered.
-    all_doc = pd.DataFrame(columns=['docId', 'colId', 'title', 'nrOfPages'])
-    for index, row in coll.iterrows():
-        logging.info(f"Query documents of collection {row['colName']}...")
-        doc_return = list_documents(sid, row['colId'])
-        for doc in doc_return:
-            all_doc = pd.concat(
-                [all_doc,
-                 pd.DataFrame([[doc['docId'],
-                                doc['collectionList']['colList'][0]['colId'],
-                                doc['title'], doc['nrOfPages']]],
-                              columns=['docId', 'colId', 'title', 'nrOfPages']
-                              )], ignore_index=True)
-    n_documents = len(all_doc)
-
-    # Analyse which documents where skipped.
-    test = all_doc.merge(dossiers_data, how='left',
-                         left_on='title', right_on='dossierId', indicator=True)
-    log_skipped = test.query("_merge == 'left_only'")['title_x'].values
-    logging.info('The following Transkribus document are not available in '
-                 f'table stabs_dossier: {log_skipped}.')
-
-    # Analyse which documents are missing.
-    test = all_doc.merge(dossiers_data, how='right',
-                         left_on='title', right_on='dossierId', indicator=True)
-    log_missing = test.query("_merge == 'right_only'")['title_y'].values
-    logging.info('The following Transkribus document where skipped: '
-                 f'{log_missing}.')
-
-    # Test if left join to stabs_dossier data returns one-to-one-connections.
-    test = pd.merge(all_doc, dossiers_data, how='left',
-                    left_on='title', right_on='dossierId',
-                    suffixes=('', '_dossier'), validate='one_to_one')
-
-    # Check if documents already exist in project database.
-    transkribus_docs = pd.DataFrame(
-        read_table(dbname=dbname, dbtable='transkribus_document',
-                   user=db_user, password=db_password,
-                   host=db_host, port=db_port),
-        columns=['docId', 'colId', 'title', 'nrOfPages'])
-    if len(transkribus_docs) > 0:
-        last_document = transkribus_docs.iloc[-1]['title']
-        logging.info('Documents already exist in the projct database. '
-                     'Processing the subsequent documents of document '
-                     f'{last_document}.')
-
-        # Skip documents that are already processed.
-        last_document_index = all_doc[
-            all_doc['title'] == last_document].index.item()
-        all_doc = all_doc.iloc[last_document_index + 1:]
-
-    # Iterate over documents.
-    for index, row in all_doc.iterrows():
+    The pages, transcripts and text regions of each document are queried and
+    extracted. The page xml of a document are queried in parallel by the
+    threads of the executor. The rows are buffered and written to the
+    project database in batches.
+
+    Args:
+        all_doc (DataFrame): Transkribus documents to be processed.
+        n_documents (int): Number of all documents, used for logging.
+        sid (str): Transkribus session id.
+        conn (connection): Open connection to the project database.
+        executor (ThreadPoolExecutor): Executor querying the page xml.
+        correct_line_order (bool): Define if text line order will be corrected.
+        batch_size (int): Number of rows of a table from which on the
+        buffered documents are written to the database.
+        cache_dir (str): Directory in which the queried page xml are cached.
+        If None, no cache is used.
+
+    Returns:
+        None.
+    """
+    # The rows are buffered and written to the project database in batches.
+    document_rows = []
+    page_rows = []
+    transcript_rows = []
+    textregion_rows = []
+    for row in all_doc.itertuples():
         # Get pages and transcripts accoring project database schema for each
         # dossier considered.
         logging.info('Query pages of document '
-                     f"{row['title']} ({index + 1}/{n_documents})..."
+                     f'{row.title} ({row.Index + 1}/{n_documents})...'
                      )
-        all_page = pd.DataFrame(
-            columns=['pageId', 'key', 'docId', 'pageNr', 'urlImage'
-                     ])
-        all_transcript = pd.DataFrame(
-            columns=['key', 'tsId', 'pageId', 'parentTsId', 'urlPageXml',
-                     'status', 'timestamp', 'htrModel'
-                     ])
-        all_textregion = pd.DataFrame(
-            columns=['textRegionId', 'key', 'index', 'type', 'textLine', 'text'
-                     ])
-        page_return = get_document_content(row['colId'], row['docId'], sid)
+        document_rows.append(row[1:])
+        page_return = get_document_content(row.colId, row.docId, sid)
+
+        # Query the page xml of all transcripts of the document in parallel.
+        # The page xml are returned in the order of the transcripts.
+        urls_page_xml = [transcript['url']
+                         for page in page_return['pageList']['pages']
+                         for transcript in page['tsList']['transcripts']]
+        page_xmls = executor.map(fetch_page_xml, urls_page_xml,
+                                 [sid] * len(urls_page_xml),
+                                 [cache_dir] * len(urls_page_xml))
 
         # Iterate over pages.
         for page in page_return['pageList']['pages']:
-            all_page = pd.concat(
-                [all_page,
-                 pd.DataFrame([
-                     [page['pageId'], page['key'],
-                      page['docId'], page['pageNr'], page['url']
-                      ]],
-                      columns=['pageId', 'key', 'docId', 'pageNr', 'urlImage'])
-                 ], ignore_index=True)
+            page_rows.append((page['pageId'], page['key'],
+                              page['docId'], page['pageNr'], page['url']))
 
             # Iterate over transcripts.
             for transcript in page['tsList']['transcripts']:
@@ -435,56 +592,43 @@ def processing_transkribus(series_data, dossiers_data, dbname,
                     transcript['timestamp']/1000
                     )
 
-                # Query the page xml and extract the data of interest.
-                page_xml = et.fromstring(get_page_xml(url_page_xml, sid))
-                creator_content = page_xml.find(
-                    './/{http://schema.primaresearch.org/PAGE/gts/pagecontent/'
-                    '2013-07-15}Creator').text
+                # Parse the page xml and extract the data of interest. The xml
+                # is parsed from the bytes received, which are decoded by lxml
+                # according its encoding declaration.
+                page_xml = et.fromstring(next(page_xmls))
+                creator_content = CREATOR_XPATH(page_xml)[0]
                 htr_model = creator_content.split(':date=')[0]
-                all_transcript = pd.concat(
-                    [all_transcript,
-                     pd.DataFrame([
-                         [key_transcript, transcript['tsId'],
-                          transcript['pageId'], transcript['parentTsId'],
-                          url_page_xml, transcript['status'], timestamp,
-                          htr_model]
-                          ],
-                          columns=['key', 'tsId', 'pageId', 'parentTsId',
-                                   'urlPageXml', 'status', 'timestamp',
-                                   'htrModel'])], ignore_index=True)
+                transcript_rows.append(
+                    (key_transcript, transcript['tsId'],
+                     transcript['pageId'], transcript['parentTsId'],
+                     url_page_xml, transcript['status'], timestamp,
+                     htr_model))
 
                 # Iterate over text regions.
-                for textregion in page_xml.iter(
-                        '{http://schema.primaresearch.org/PAGE/gts/pagecontent'
-                        '/2013-07-15}TextRegion'):
+                for textregion in TEXTREGION_XPATH(page_xml):
                     # Determine type of text region.
                     textregion_custom = textregion.get('custom')
                     index_textregion = int(
-                        re.search(
-                            r'index:[0-9]+;', textregion_custom).group()[6:-1]
-                        )
-                    match = re.search(r'type:[a-z]+;', textregion_custom)
+                        INDEX_RE.search(textregion_custom).group(1))
+                    match = TYPE_RE.search(textregion_custom)
                     if match:
-                        type_textregion = match.group()[5:-1]
+                        type_textregion = match.group(1)
                     else:
                         type_textregion = None
 
                     if correct_line_order:
-                        # Correct the text line order.
-                        textregion_text = pd.DataFrame(
-                            columns=['text_line',
-                                     'min_x', 'max_x',
-                                     'min_y', 'max_y'
-                                     ])
-                        for textline in textregion.findall(
-                                './/{http://schema.primaresearch.org/PAGE/gts/'
-                                'pagecontent/2013-07-15}TextLine'):
+                        # Correct the text line order. The text lines and
+                        # their coordinate boarders are collected per column.
+                        text_lines = []
+                        min_xs = []
+                        max_xs = []
+                        min_ys = []
+                        max_ys = []
+                        for textline in TEXTLINE_XPATH(textregion):
                             # Extract the transcripted text.
-                            textline_unicode = textline.find(
-                                './/{http://schema.primaresearch.org/PAGE/gts/'
-                                'pagecontent/2013-07-15}Unicode')
-                            if textline_unicode is not None:
-                                textline_text = textline_unicode.text
+                            textline_unicode = UNICODE_XPATH(textline)
+                            if textline_unicode:
+                                textline_text = textline_unicode[0].text
                                 if not textline_text:
                                     # Skip empty text lines.
                                     continue
@@ -492,35 +636,31 @@ def processing_transkribus(series_data, dossiers_data, dbname,
                                 # Do not consider empty text lines.
                                 continue
 
-                            # Get the line coordinates.
-                            coords_raw = textline.find(
-                                './/{http://schema.primaresearch.org/PAGE/gts/'
-                                'pagecontent/2013-07-15}Coords').get('points')
-                            coords_list = coords_raw.split(' ')
-                            coord_x = []
-                            coord_y = []
-                            for coord in coords_list:
-                                coord_x.append(int(coord.split(',')[0]))
-                                coord_y.append(int(coord.split(',')[1]))
+                            # Get the line coordinates as an array of x, y
+                            # pairs.
+                            coords_raw = POINTS_XPATH(textline)[0]
+                            coords = np.array(
+                                coords_raw.replace(',', ' ').split(),
+                                dtype=np.int64).reshape(-1, 2)
+                            coord_x = coords[:, 0]
+                            coord_y = coords[:, 1]
 
                             # Determine the coordinate boarders for each text
                             # line.
-                            min_y = (statistics.mean(coord_y)
-                                     - (max(coord_y)
-                                     - statistics.mean(coord_y))/3)
-                            max_y = (statistics.mean(coord_y)
-                                     + (max(coord_y)
-                                     - statistics.mean(coord_y))/3)
-                            textregion_text = pd.concat(
-                                [textregion_text,
-                                 pd.DataFrame([
-                                    [textline_text,
-                                     min(coord_x), max(coord_x),
-                                     min_y, max_y]],
-                                    columns=['text_line',
-                                             'min_x', 'max_x',
-                                             'min_y', 'max_y'])
-                                 ], ignore_index=True)
+                            mean_y = coord_y.mean()
+                            delta_y = (coord_y.max() - mean_y)/3
+                            text_lines.append(textline_text)
+                            min_xs.append(coord_x.min())
+                            max_xs.append(coord_x.max())
+                            min_ys.append(mean_y - delta_y)
+                            max_ys.append(mean_y + delta_y)
+                        textregion_text = pd.DataFrame({
+                            'text_line': text_lines,
+                            'min_x': np.asarray(min_xs, dtype=np.int64),
+                            'max_x': np.asarray(max_xs, dtype=np.int64),
+                            'min_y': np.asarray(min_ys, dtype=np.float64),
+                            'max_y': np.asarray(max_ys, dtype=np.float64)
+                            })
 
                         # Get the number of text lines.
                         nlines = len(textregion_text)
@@ -580,8 +720,8 @@ def processing_transkribus(series_data, dossiers_data, dbname,
                                         item + 1 for item in index_sorted_x]
                                     logging.info(
                                         'Correct text line order: '
-                                        f"document {row['title']} "
-                                        f"({row['docId']}), "
+                                        f'document {row.title} '
+                                        f'({row.docId}), '
                                         f"page number {page['pageNr']} "
                                         f"({page['pageId']}), "
                                         f'transcript {key_transcript}, '
@@ -596,9 +736,7 @@ def processing_transkribus(series_data, dossiers_data, dbname,
                     else:
                         # Do not correct the oder of the text lines.
                         # Find all unicode tag childs.
-                        unicode = textregion.findall(
-                            './/{http://schema.primaresearch.org/PAGE/gts/'
-                            'pagecontent/2013-07-15}Unicode')
+                        unicode = UNICODE_XPATH(textregion)
 
                         # Extract all text lines. Exclude last candidate,
                         # correspond to the whole text of the region as well as
@@ -617,40 +755,66 @@ def processing_transkribus(series_data, dossiers_data, dbname,
                     text_region_id = f'{key_transcript}_'\
                         f'{int(index_textregion):02}'
 
-                    # Add text region to dataframe.
-                    all_textregion = pd.concat(
-                        [all_textregion,
-                         pd.DataFrame([
-                             [text_region_id, key_transcript,
-                              index_textregion, type_textregion,
-                              text_line, text]],
-                              columns=['textRegionId', 'key', 'index', 'type',
-                                       'textLine', 'text'])
-                         ], ignore_index=True)
-
-        # Write data for current document to project database.
-        populate_table(df=pd.DataFrame([row.tolist()], columns=row.index),
-                       dbname=dbname, dbtable='transkribus_document',
-                       user=db_user, password=db_password,
-                       host=db_host, port=db_port, info=False
-                       )
-        populate_table(df=all_page, dbname=dbname, dbtable='transkribus_page',
-                       user=db_user, password=db_password,
-                       host=db_host, port=db_port, info=False
-                       )
-        populate_table(df=all_transcript, dbname=dbname,
-                       dbtable='transkribus_transcript',
-                       user=db_user, password=db_password,
-                       host=db_host, port=db_port, info=False
-                       )
-        populate_table(df=all_textregion, dbname=dbname,
-                       dbtable='transkribus_textregion',
-                       user=db_user, password=db_password,
-                       host=db_host, port=db_port, info=False
-                       )
+                    # Add text region to the rows of this document.
+                    textregion_rows.append(
+                        (text_region_id, key_transcript,
+                         index_textregion, type_textregion,
+                         text_line, text))
+
+        # Write the buffered documents to project database as soon as the
+        # rows of one table reach the batch size.
+        if max(len(document_rows), len(page_rows), len(transcript_rows),
+               len(textregion_rows)) >= batch_size:
+            write_transkribus_rows(conn, document_rows, page_rows,
+                                   transcript_rows, textregion_rows)
+            document_rows.clear()
+            page_rows.clear()
+            transcript_rows.clear()
+            textregion_rows.clear()
+
+    # Write the remaining documents to project database.
+    if document_rows:
+        write_transkribus_rows(conn, document_rows, page_rows,
+                               transcript_rows, textregion_rows)
+
+
+def write_transkribus_rows(conn, document_rows, page_rows, transcript_rows,
+                           textregion_rows):
+    """Write buffered Transkribus data to the project database.
+
+    The rows are written in the order of the foreign keys within one
+    transaction. Hence, either all or none of the buffered documents are
+    stored in the project database.
 
+    Args:
+        conn (connection): Open connection to the destination database.
+        document_rows (list): Rows of table transkribus_document.
+        page_rows (list): Rows of table transkribus_page.
+        transcript_rows (list): Rows of table transkribus_transcript.
+        textregion_rows (list): Rows of table transkribus_textregion.
 
-def get_year(page_id, df_transcript, df_textregion, year_pattern=r'1[0-9]{3}'):
+    Returns:
+        None.
+    """
+    copy_rows(conn, 'transkribus_document',
+              ['docId', 'colId', 'title', 'nrOfPages'],
+              document_rows)
+    copy_rows_binary(conn, 'transkribus_page',
+                     ['pageId', 'key', 'docId', 'pageNr', 'urlImage'],
+                     ['integer', 'text', 'integer', 'smallint', 'text'],
+                     page_rows)
+    copy_rows(conn, 'transkribus_transcript',
+              ['key', 'tsId', 'pageId', 'parentTsId', 'urlPageXml',
+               'status', 'timestamp', 'htrModel'],
+              transcript_rows)
+    copy_rows(conn, 'transkribus_textregion',
+              ['textRegionId', 'key', 'index', 'type', 'textLine', 'text'],
+              textregion_rows)
+    conn.commit()
+
+
+def get_year(page_id, df_transcript_latest, df_textregion,
+             year_pattern=r'1[0-9]{3}'):
     """Extract the occurrence of a year in text regions of latest transcript.
 
     Using the existing data in the project database, a year of the pattern
@@ -664,8 +828,8 @@ def get_year(page_id, df_transcript, df_textregion, year_pattern=r'1[0-9]{3}'):
 
     Args:
         page_id (list): List of page_id's of pages to be considered.
-        df_transcript (DataFrame): Table of all transcript within the project
-        database.
+        df_transcript_latest (DataFrame): Latest transcript of each page
+        within the project database, indexed by pageId.
         df_textregion (DataFrame): Table of all text regions within the
         project database.
         year_pattern (str): Pattern of the year to be searched.
@@ -675,12 +839,12 @@ def get_year(page_id, df_transcript, df_textregion, year_pattern=r'1[0-9]{3}'):
         of the year, the second element to the id of the text region, from
         which the year comes. If there is no year, None is returned.
     """
+    year_re = re.compile(year_pattern)
+
     # Iterate over all page_id's.
     for page in page_id:
-        # Determine latest transcript of current page.
-        ts = df_transcript[df_transcript['pageId'] == page]
-        ts_sorted = ts.sort_values(by='timestamp', ascending=False)
-        ts_latest = ts_sorted.iloc[0]
+        # Get latest transcript of current page.
+        ts_latest = df_transcript_latest.loc[page]
 
         # Get the header textregions of latest transcript.
         tr = df_textregion[df_textregion['key'] == ts_latest['key']]
@@ -690,20 +854,18 @@ def get_year(page_id, df_transcript, df_textregion, year_pattern=r'1[0-9]{3}'):
 
         # Search for first year occurance in header textregions.
         for header in tr_header.iterrows():
-            match = re.search(year_pattern, header[1]['text'])
+            match = year_re.search(header[1]['text'])
             if match:
                 return (int(match.group()), header[1]['textRegionId'])
 
         # Search for year in text region "paragraph" when header text region
         # contains a string like "Zins".
         for header in tr_header.iterrows():
-            match_header = re.search(r'[Zz][iü]n[n]?s', header[1]['text'])
+            match_header = ZINS_RE.search(header[1]['text'])
             if match_header:
                 tr_paragraph = tr[tr['type'] == 'paragraph']
                 for paragraph in tr_paragraph.iterrows():
-                    match_paragraph = re.search(year_pattern,
-                                                paragraph[1]['text']
-                                                )
+                    match_paragraph = year_re.search(paragraph[1]['text'])
                     if match_paragraph:
                         return (int(match_paragraph.group()),
                                 paragraph[1]['textRegionId']
@@ -712,7 +874,8 @@ def get_year(page_id, df_transcript, df_textregion, year_pattern=r'1[0-9]{3}'):
     return (None, None)
 
 
-def get_language(page_id, df_transcript, df_textregion, tr_type='paragraph'):
+def get_language(page_id, df_transcript_latest, df_textregion,
+                 tr_type='paragraph'):
     """Determine the language of text regions.
 
     Using the existing data in the project database, this method determines
@@ -730,8 +893,8 @@ def get_language(page_id, df_transcript, df_textregion, tr_type='paragraph'):
 
     Args:
         page_id (list): List of page_id's of pages to be considered.
-        df_transcript (DataFrame): Table of all transcript within the
-        project database.
+        df_transcript_latest (DataFrame): Latest transcript of each page
+        within the project database, indexed by pageId.
         df_textregion (DataFrame): Table of all text regions within the
         project database.
         tr_type (str): Type of text region on which speech recognition should
@@ -744,10 +907,8 @@ def get_language(page_id, df_transcript, df_textregion, tr_type='paragraph'):
     # Iterate over all page_id's to get all text of textregion of type tr_type.
     tr_merged = ''
     for page in page_id:
-        # Determine latest transcript of current page.
-        ts = df_transcript[df_transcript['pageId'] == page]
-        ts_sorted = ts.sort_values(by='timestamp', ascending=False)
-        ts_latest = ts_sorted.iloc[0]
+        # Get latest transcript of current page.
+        ts_latest = df_transcript_latest.loc[page]
 
         # Get the textregions of type tr_type and extract their text.
         tr = df_textregion[df_textregion['key'] == ts_latest['key']]
@@ -756,7 +917,7 @@ def get_language(page_id, df_transcript, df_textregion, tr_type='paragraph'):
             tr_merged = tr_merged + " ".join(tr_row[1]['textLine']) + ' '
 
     # Remove special characters.
-    tr_merged = re.sub(r'[^\w\säöü]', '', tr_merged)
+    tr_merged = SPECIAL_CHARACTER_RE.sub('', tr_merged)
 
     # Get the confidence for German and Latin.
     detector = LanguageDetectorBuilder.from_all_languages().build()
@@ -830,18 +991,18 @@ def get_validity_range(remark: str):
         year_to = None
 
     # Search for year number from.
-    match_from = re.search(r'^((Seit)|(Errichtet)|(Ab)) 1[0-9]{3}\.', remark)
+    match_from = VALIDITY_FROM_RE.search(remark)
     if match_from:
         year_from = match_from.group()[-5:-1]
 
     # Search for year number to.
-    match_to = re.search(r'((Bis)|(Abgebrochen)) 1[0-9]{3}\.', remark)
+    match_to = VALIDITY_TO_RE.search(remark)
     if match_to:
         year_to = match_to.group()[-5:-1]
 
     # Consider patterns like "1734-1819".
     if not year_from and not year_to:
-        match = re.match(r'^1[0-9]{3}-1[0-9]{3}\.?$', remark)
+        match = VALIDITY_RANGE_RE.match(remark)
         if match:
             year_from = match.group()[:4]
             year_to = match.group()[5:9]
@@ -861,7 +1022,8 @@ def processing_project(dbname, db_password, db_user='postgres',
                        filepath_addressmatchingtype='',
                        filepath_projectrelationship='',
                        filepath_source='',
-                       filepath_specialtype=''):
+                       filepath_specialtype='',
+                       conn=None):
     """Processes the project data within the project database.
 
     This function processes all tables of the project database with the prefix
@@ -963,6 +1125,7 @@ def processing_project(dbname, db_password, db_user='postgres',
         entry source.
         filepath_specialtype (str): Filepath of the file containing the data
         for dossier special types.
+        conn (connection): Open connection to the project database.
 
     Returns:
         None.
@@ -971,53 +1134,52 @@ def processing_project(dbname, db_password, db_user='postgres',
     stabs_dossier = pd.DataFrame(
         read_table(dbname=dbname, dbtable='stabs_dossier',
                    user=db_user, password=db_password,
-                   host=db_host, port=db_port),
+                   host=db_host, port=db_port, conn=conn),
         columns=['dossierId', 'serieId', 'stabsId', 'title', 'link',
                  'houseName', 'oldHousenumber', 'owner1862', 'descriptiveNote'
                  ])
     document = pd.DataFrame(
         read_table(dbname=dbname, dbtable='transkribus_document',
                    user=db_user, password=db_password,
-                   host=db_host, port=db_port),
+                   host=db_host, port=db_port, conn=conn),
         columns=['docId', 'colId', 'title', 'nrOfPages'])
     page = pd.DataFrame(
         read_table(dbname=dbname, dbtable='transkribus_page',
                    user=db_user, password=db_password,
-                   host=db_host, port=db_port),
+                   host=db_host, port=db_port, conn=conn),
         columns=['pageId', 'key', 'docId', 'pageNr', 'urlImage', 'entryId'])
     transcript = pd.DataFrame(
         read_table(dbname=dbname, dbtable='transkribus_transcript',
                    user=db_user, password=db_password,
-                   host=db_host, port=db_port),
+                   host=db_host, port=db_port, conn=conn),
         columns=['key', 'tsId', 'pageId', 'parentTsId', 'urlPageXml', 'status',
                  'timestamp', 'htrModel'])
     textregion = pd.DataFrame(
         read_table(dbname=dbname, dbtable='transkribus_textregion',
                    user=db_user, password=db_password,
-                   host=db_host, port=db_port),
+                   host=db_host, port=db_port, conn=conn),
         columns=['textRegionId', 'key', 'index', 'type', 'textLine', 'text'])
     geo_address = read_geotable(dbname=dbname, dbtable='geo_address',
                                 geom_col='geom',
                                 user=db_user, password=db_password,
-                                host=db_host, port=db_port)
+                                host=db_host, port=db_port, conn=conn)
 
     # Read the entries to correct.
     if correct_entry:
         entry_correction1 = pd.read_csv(filepath_corr1)
         entry_correction2 = pd.read_csv(filepath_corr2)
 
+    # Determine latest transcript per page once.
+    transcript_latest = transcript.loc[
+        transcript.groupby('pageId', sort=False)['timestamp'].idxmax()
+        ].set_index('pageId')
+
     # Order the pages by docid and pagenr (might not be ordered in database).
     page = page.sort_values(by=['docId', 'pageNr'], ascending=[True, True])
 
-    # Generate entries of table project_entry.
-    entry = pd.DataFrame(columns=['dossierId', 'pageId',
-                                  'year', 'yearSource',
-                                  'comment',
-                                  'manuallyCorrected',
-                                  'language',
-                                  'source', 'sourceOrigin',
-                                  'keyLatestTranscript'])
-    entry['manuallyCorrected'] = entry['manuallyCorrected'].astype(bool)
+    # Generate entries of table project_entry. The entries are collected as
+    # dicts, subsequent pages of the same entry are added to the last one.
+    entry_rows = []
     entry_prev_docid = None
     page_prev_has_credit = None
     page_prev_status = None
@@ -1033,10 +1195,8 @@ def processing_project(dbname, db_password, db_user='postgres',
             page_corr2 = entry_correction2[
                 row[1]['pageId'] == entry_correction2['pageid']]
 
-        # Determine latest transcript of current page.
-        ts = transcript[transcript['pageId'] == row[1]['pageId']]
-        ts_sorted = ts.sort_values(by='timestamp', ascending=False)
-        ts_latest = ts_sorted.iloc[0]
+        # Get latest transcript of current page.
+        ts_latest = transcript_latest.loc[row[1]['pageId']]
 
         # Get the text regions of latest transcript.
         tr = textregion[textregion['key'] == ts_latest['key']]
@@ -1056,17 +1216,16 @@ def processing_project(dbname, db_password, db_user='postgres',
                        'skipped: Folgeseite'))):
             # The content of the current page is considered as same entry
             # than on the previous page.
-            entry.at[entry.index[-1], 'pageId'] += [row[1]['pageId']]
-            entry.at[entry.index[-1], 'manuallyCorrected'] = True
-            entry.at[entry.index[-1], 'keyLatestTranscript'] += [
-                ts_latest['key']]
-            if entry.at[entry.index[-1], 'dossierId'] != dossierid:
+            entry_rows[-1]['pageId'].append(row[1]['pageId'])
+            entry_rows[-1]['manuallyCorrected'] = True
+            entry_rows[-1]['keyLatestTranscript'].append(ts_latest['key'])
+            if entry_rows[-1]['dossierId'] != dossierid:
                 logging.warning(
                     f"Page with pageId={row[1]['pageId']}, "
                     f'dossierId={dossierid} is manually defined as same entry '
                     'than page with pageId='
-                    f"{entry.at[entry.index[-1], 'pageId'][0]}, "
-                    f"dossierId={entry.at[entry.index[-1], 'dossierId']}. But "
+                    f"{entry_rows[-1]['pageId'][0]}, "
+                    f"dossierId={entry_rows[-1]['dossierId']}. But "
                     'this pages belong not to same Dossier.'
                     )
         elif (page_prev_has_credit is False
@@ -1076,29 +1235,18 @@ def processing_project(dbname, db_password, db_user='postgres',
               and not any(tr['type'].isin(['header']))):
             # The content of the current page is considered as same entry
             # than on the previous page.
-            entry.at[entry.index[-1], 'pageId'] += [row[1]['pageId']]
-            entry.at[entry.index[-1], 'keyLatestTranscript'] += [
-                ts_latest['key']]
+            entry_rows[-1]['pageId'].append(row[1]['pageId'])
+            entry_rows[-1]['keyLatestTranscript'].append(ts_latest['key'])
         else:
             # The content of the current page is considered as new entry.
-            entry = pd.concat(
-                [entry,
-                 pd.DataFrame([[dossierid, [row[1]['pageId']],
-                                None, None,
-                                None,
-                                False,
-                                None,
-                                None, None,
-                                [ts_latest['key']]
-                                ]],
-                              columns=['dossierId', 'pageId',
-                                       'year', 'yearSource',
-                                       'comment',
-                                       'manuallyCorrected',
-                                       'language',
-                                       'source', 'sourceOrigin',
-                                       'keyLatestTranscript'])
-                 ], ignore_index=True)
+            entry_rows.append({'dossierId': dossierid,
+                               'pageId': [row[1]['pageId']],
+                               'year': None, 'yearSource': None,
+                               'comment': None,
+                               'manuallyCorrected': False,
+                               'language': None,
+                               'source': None, 'sourceOrigin': None,
+                               'keyLatestTranscript': [ts_latest['key']]})
             entry_prev_docid = row[1]['docId']
 
         # Set parameters for the next iteration.
@@ -1107,11 +1255,20 @@ def processing_project(dbname, db_password, db_user='postgres',
         else:
             page_prev_has_credit = None
         page_prev_status = ts_latest['status']
+    entry = pd.DataFrame(entry_rows,
+                         columns=['dossierId', 'pageId',
+                                  'year', 'yearSource',
+                                  'comment',
+                                  'manuallyCorrected',
+                                  'language',
+                                  'source', 'sourceOrigin',
+                                  'keyLatestTranscript'])
+    entry['manuallyCorrected'] = entry['manuallyCorrected'].astype(bool)
 
     # Search for occurence in year of the latest page version.
     entry[['year', 'yearSource']] = entry.apply(
         lambda row: get_year(page_id=row['pageId'],
-                             df_transcript=transcript,
+                             df_transcript_latest=transcript_latest,
                              df_textregion=textregion),
         axis=1,
         result_type='expand'
@@ -1172,7 +1329,7 @@ def processing_project(dbname, db_password, db_user='postgres',
     # Classify the language of the entry in text region paragraph.
     entry['language'] = entry.apply(
         lambda row: get_language(page_id=row['pageId'],
-                                 df_transcript=transcript,
+                                 df_transcript_latest=transcript_latest,
                                  df_textregion=textregion),
         axis=1,
         result_type='expand'
@@ -1435,7 +1592,7 @@ def processing_project(dbname, db_password, db_user='postgres',
                       )
     populate_table(df=entry, dbname=dbname, dbtable='project_entry',
                    user=db_user, password=db_password,
-                   host=db_host, port=db_port
+                   host=db_host, port=db_port, conn=conn
                    )
 
     # Generate the entity project_relationship.
@@ -1448,7 +1605,7 @@ def processing_project(dbname, db_password, db_user='postgres',
         populate_table(df=relationship, dbname=dbname,
                        dbtable='project_relationship',
                        user=db_user, password=db_password,
-                       host=db_host, port=db_port
+                       host=db_host, port=db_port, conn=conn
                        )
         logging.info('Entity project_relationship generated.')
     else:
@@ -1458,7 +1615,7 @@ def processing_project(dbname, db_password, db_user='postgres',
 def import_shapefile(dbname, dbtable,
                      shapefile_path, shapefile_epsg,
                      db_password, db_user='postgres',
-                     db_host='localhost', db_port=5432):
+                     db_host='localhost', db_port=5432, conn=None):
     """Import a shapefile to a new database table.
 
     This function imports a shapefile with a defined coordinate system into a
@@ -1474,6 +1631,7 @@ def import_shapefile(dbname, dbtable,
         db_user (str): User of the database connection.
         db_host (str): Host of the database connection.
         db_port (int,str): Port of the database connection.
+        conn (connection): Open connection to the project database.
 
     Returns:
         None.
@@ -1481,7 +1639,7 @@ def import_shapefile(dbname, dbtable,
     # Test if dbtable already exist.
     dbtable_exist = check_dbtable_exist(dbname=dbname, dbtable=dbtable,
                                         user=db_user, password=db_password,
-                                        host=db_host, port=db_port
+                                        host=db_host, port=db_port, conn=conn
                                         )
     if dbtable_exist:
         logging.warning(f'Table {dbtable} already exist in database {dbname}. '
@@ -1497,17 +1655,13 @@ def import_shapefile(dbname, dbtable,
         result = os.system(command)
         if result == 0:
             # Grant read_only user to geodata table.
-            conn = psycopg2.connect(dbname=dbname, user=db_user,
-                                    password=db_password,
-                                    host=db_host, port=db_port
-                                    )
-            conn.autocommit = True
-            cursor = conn.cursor()
-            cursor.execute("""
-            GRANT SELECT ON TABLE public.geo_address TO read_only
-            """
-                           )
-            conn.close()
+            with open_connection(conn, dbname, db_user, db_password,
+                                 db_host, db_port) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                GRANT SELECT ON TABLE public.geo_address TO read_only
+                """
+                               )
             logging.info(f'Shapefile {shapefile_path} successfully imported '
                          f'into database {dbname}, table {dbtable}.'
                          )
@@ -1519,7 +1673,7 @@ def import_shapefile(dbname, dbtable,
 
 def processing_geodata(shapefile_path, shapefile_epsg,
                        dbname, db_password, db_user='postgres',
-                       db_host='localhost', db_port=5432):
+                       db_host='localhost', db_port=5432, conn=None):
     """Processes the geodata within the project database.
 
     This function processes all tables of the project database with the prefix
@@ -1534,6 +1688,7 @@ def processing_geodata(shapefile_path, shapefile_epsg,
         db_user (str): User of the database connection.
         db_host (str): Host of the database connection.
         db_port (int,str): Port of the database connection.
+        conn (connection): Open connection to the project database.
 
     Returns:
         None.
@@ -1544,26 +1699,22 @@ def processing_geodata(shapefile_path, shapefile_epsg,
         dbname=dbname, dbtable=dbtable,
         shapefile_path=shapefile_path, shapefile_epsg=shapefile_epsg,
         db_password=db_password, db_user=db_user,
-        db_host=db_host, db_port=db_port
+        db_host=db_host, db_port=db_port, conn=conn
         )
 
     # Add foreign key for geo_address to stabs_dossier.
-    conn = psycopg2.connect(dbname=dbname,
-                            user=db_user, password=db_password,
-                            host=db_host, port=db_port
-                            )
-    conn.autocommit = True
-    cursor = conn.cursor()
-    cursor.execute("""
-    ALTER TABLE geo_address
-    ADD CONSTRAINT stabs_dossier_stabsid_fkey
-    FOREIGN KEY (signatur) REFERENCES stabs_dossier(stabsid)
-    """
-                   )
-    conn.close()
+    with open_connection(conn, dbname, db_user, db_password,
+                         db_host, db_port) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+        ALTER TABLE geo_address
+        ADD CONSTRAINT stabs_dossier_stabsid_fkey
+        FOREIGN KEY (signatur) REFERENCES stabs_dossier(stabsid)
+        """
+                       )
 
 
-def create_worktable(dbname, user, password, host, port=5432):
+def create_worktable(dbname, user, password, host, port=5432, conn=None):
     """Create particular database table.
 
     Args:
@@ -1572,6 +1723,7 @@ def create_worktable(dbname, user, password, host, port=5432):
         password (str): Passwort for database user.
         host (str): Host of the database connection.
         port (str): Port of the database connection.
+        conn (connection): Open connection to the database.
 
     Returns:
         None.
@@ -1579,53 +1731,50 @@ def create_worktable(dbname, user, password, host, port=5432):
     table_name = 'transcript_date_geom'
     dbview_exist = check_dbtable_exist(dbname=dbname, dbtable=table_name,
                                        user=user, password=password,
-                                       host=host, port=port
+                                       host=host, port=port, conn=conn
                                        )
     if dbview_exist:
         logging.warning(f'Table {table_name} already exist in database '
                         f'{dbname}. The table will not be new created.')
     else:
-        conn = psycopg2.connect(dbname=dbname,
-                                user=user, password=password,
-                                host=host, port=port)
-        conn.autocommit = True
-        cursor = conn.cursor()
-        cursor.execute(f"""
-        CREATE TABLE {table_name} AS
-        SELECT
-            td.title AS hgb_dossier,
-            tp.pagenr AS seite,
-            tp.pageid,
-            tt.text AS transkript,
-            tt.type AS layout_typ,
-            pe.year AS jahr,
-            pe.entryid,
-            pd.locationshifted,
-            CASE
-                WHEN pd.locationshiftedorigin = 'keine Verschiebung'
-                    THEN pd.locationorigin
-                ELSE pd.locationshiftedorigin
-            END AS herkunft_standort,
-            tp.urlimage AS bild_link
-        FROM transkribus_textregion tt
-        JOIN transkribus_transcript tt2 ON tt.key::text = tt2.key::text
-        JOIN transkribus_page tp ON tt2.pageid = tp.pageid
-        JOIN transkribus_document td ON tp.docid = td.docid
-        JOIN project_dossier pd ON td.title::text = pd.dossierid::text
-        LEFT JOIN project_entry pe ON tp.pageid = ANY (pe.pageid)
-        """
-                       )
-        cursor.execute(f"""
-        CREATE INDEX transkript_idx
-        ON {table_name}
-        USING gist (transkript gist_trgm_ops)"""
-                       )
-        cursor.execute(f"""
-        GRANT SELECT
-        ON TABLE {table_name}
-        TO read_only"""
-                       )
-        conn.close()
+        with open_connection(conn, dbname, user, password,
+                             host, port) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+            CREATE TABLE {table_name} AS
+            SELECT
+                td.title AS hgb_dossier,
+                tp.pagenr AS seite,
+                tp.pageid,
+                tt.text AS transkript,
+                tt.type AS layout_typ,
+                pe.year AS jahr,
+                pe.entryid,
+                pd.locationshifted,
+                CASE
+                    WHEN pd.locationshiftedorigin = 'keine Verschiebung'
+                        THEN pd.locationorigin
+                    ELSE pd.locationshiftedorigin
+                END AS herkunft_standort,
+                tp.urlimage AS bild_link
+            FROM transkribus_textregion tt
+            JOIN transkribus_transcript tt2 ON tt.key::text = tt2.key::text
+            JOIN transkribus_page tp ON tt2.pageid = tp.pageid
+            JOIN transkribus_document td ON tp.docid = td.docid
+            JOIN project_dossier pd ON td.title::text = pd.dossierid::text
+            LEFT JOIN project_entry pe ON tp.pageid = ANY (pe.pageid)
+            """
+                           )
+            cursor.execute(f"""
+            CREATE INDEX transkript_idx
+            ON {table_name}
+            USING gist (transkript gist_trgm_ops)"""
+                           )
+            cursor.execute(f"""
+            GRANT SELECT
+            ON TABLE {table_name}
+            TO read_only"""
+                           )
 
         logging.info(f'Work table {table_name} created.')
 
@@ -1660,10 +1809,6 @@ def main():
     # Get parameters of the database.
     db_password = input('PostgreSQL database superuser password:')
     db_port = input('PostgreSQL database port:')
-    dblink_connname = f'dbname={DB_NAME} '\
-        f'user={DB_USER} password={db_password} '\
-        f'host={DB_HOST} port={db_port}'
-
     # Define name for temporary database in case the script breaks.
     dbname_temp = DB_NAME + '_temp'
 
@@ -1687,24 +1832,44 @@ def main():
     else:
         logging.warning(f'The database {dbname_temp} already exist.')
 
+    # Open one connection to the temporary database shared by all subsequent
+    # database operations.
+    conn = psycopg2.connect(dbname=dbname_temp,
+                            user=DB_USER, password=db_password,
+                            host=DB_HOST, port=db_port
+                            )
+
     # Check if database does exist.
     db_exist = check_database_exist(dbname=DB_NAME,
                                     user=DB_USER, password=db_password,
-                                    host=DB_HOST, port=db_port
+                                    host=DB_HOST, port=db_port, conn=conn
                                     )
 
-    # Processing metadata.
-    stabs_serie_empty = check_table_empty(
-        dbname=dbname_temp, dbtable='stabs_serie',
-        user=DB_USER, password=db_password,
-        host=DB_HOST, port=db_port
-        )
-    stabs_dossier_empty = check_table_empty(
-        dbname=dbname_temp, dbtable='stabs_dossier',
+    # Open a connection to the current database to copy data from.
+    if db_exist:
+        conn_source = psycopg2.connect(dbname=DB_NAME,
+                                       user=DB_USER, password=db_password,
+                                       host=DB_HOST, port=db_port
+                                       )
+        conn_source.autocommit = True
+
+    # Check which tables are empty. The processing steps below do not write
+    # to tables checked by a later step, hence all tables are checked at once.
+    tables_empty = check_tables_empty(
+        dbname=dbname_temp,
+        dbtables=['stabs_serie', 'stabs_dossier',
+                  'transkribus_collection', 'transkribus_document',
+                  'transkribus_page', 'transkribus_transcript',
+                  'transkribus_textregion',
+                  'project_dossier', 'project_entry'],
         user=DB_USER, password=db_password,
-        host=DB_HOST, port=db_port
+        host=DB_HOST, port=db_port, conn=conn
         )
-    if not all((stabs_serie_empty, stabs_dossier_empty)):
+
+    # Processing metadata.
+    series_data = None
+    dossiers_data = None
+    if not all((tables_empty['stabs_serie'], tables_empty['stabs_dossier'])):
         logging.warning(
             f'Metadata table(s) are not empty in database {dbname_temp}. '
             f'No metadata will be new processed or copied from {DB_NAME}.'
@@ -1712,138 +1877,102 @@ def main():
     # Case when all metadata tables are empty.
     else:
         if process_metadata:
-            processing_stabs(filepath_serie=FILEPATH_SERIE,
-                             filepath_dossier=FILEPATH_DOSSIER,
-                             dbname=dbname_temp,
-                             db_user=DB_USER, db_password=db_password,
-                             db_host=DB_HOST, db_port=db_port
-                             )
+            series_data, dossiers_data = processing_stabs(
+                filepath_serie=FILEPATH_SERIE,
+                filepath_dossier=FILEPATH_DOSSIER,
+                filepath_serie_parquet=FILEPATH_SERIE_PARQUET,
+                filepath_dossier_parquet=FILEPATH_DOSSIER_PARQUET,
+                dbname=dbname_temp,
+                db_user=DB_USER, db_password=db_password,
+                db_host=DB_HOST, db_port=db_port,
+                conn=conn
+                )
             logging.info('Metadata are processed.')
         elif db_exist:
             # Copy existing tables stabs_serie and stabs_dossier from database
             # hgb to database hgb_temp.
-            conn = psycopg2.connect(dbname=dbname_temp,
-                                    user=DB_USER, password=db_password,
-                                    host=DB_HOST, port=db_port
-                                    )
-            conn.autocommit = True
-            cursor = conn.cursor()
-            cursor.execute(f"""
-            INSERT INTO stabs_serie
-            SELECT * FROM dblink('{dblink_connname}',
-            'SELECT serieid,stabsid,title,link FROM stabs_serie')
-            AS t(serieid text, stabsid text, title text, link text)
-            """)
-            cursor.execute(f"""
-            INSERT INTO stabs_dossier
-            SELECT * FROM dblink('{dblink_connname}',
-            'SELECT dossierid,serieid,stabsid,title,link,housename,
-            oldhousenumber,owner1862,descriptivenote FROM stabs_dossier')
-            AS t(dossierid text, serieid text, stabsid text, title text,
-            link text, housename text, oldhousenumber text, owner1862 text,
-            descriptivenote text)
-            """)
-            cursor.execute(f"""
-            INSERT INTO stabs_klingental_regest
-            SELECT * FROM dblink('{dblink_connname}',
-            'SELECT link,identifier,title,descriptivenote,expresseddate
-            FROM stabs_klingental_regest')
-            AS t(link text, identifier text, title text, descriptivenote text,
-            expresseddate text)
-            """)
-            conn.close()
+            copy_table(conn_source, conn, 'stabs_serie',
+                       ['serieid', 'stabsid', 'title', 'link'])
+            copy_table(conn_source, conn, 'stabs_dossier',
+                       ['dossierid', 'serieid', 'stabsid', 'title', 'link',
+                        'housename', 'oldhousenumber', 'owner1862',
+                        'descriptivenote'])
+            copy_table(conn_source, conn, 'stabs_klingental_regest',
+                       ['link', 'identifier', 'title', 'descriptivenote',
+                        'expresseddate'])
+            conn.commit()
             logging.info('Metadata are copied from current database.')
         else:
             logging.warning('No metadata will be available in database.')
 
-    # Processing transkribus data.
+    # Processing transkribus data. Where text regions are loaded, the text
+    # index is dropped while loading them and created once afterwards, also if
+    # the loading fails.
     if process_transkribus:
-        # Read series and dossiers created by processing_stabs() for
-        # selecting transkribus features.
-        series_data = pd.read_csv(FILEPATH_SERIE)
-        dossiers_data = pd.read_csv(FILEPATH_DOSSIER)
-        processing_transkribus(series_data=series_data,
-                               dossiers_data=dossiers_data,
-                               dbname=dbname_temp,
-                               db_user=DB_USER, db_password=db_password,
-                               db_host=DB_HOST, db_port=db_port,
-                               correct_line_order=CORRECT_LINE_ORDER
-                               )
+        # Series and dossiers are needed for selecting transkribus features.
+        # If the metadata were not processed in this run, read those written
+        # by processing_stabs(). Fall back to the csv files if no parquet
+        # files were written yet.
+        if series_data is None:
+            if (os.path.exists(FILEPATH_SERIE_PARQUET)
+                    and os.path.exists(FILEPATH_DOSSIER_PARQUET)):
+                series_data = pd.read_parquet(FILEPATH_SERIE_PARQUET)
+                dossiers_data = pd.read_parquet(FILEPATH_DOSSIER_PARQUET)
+            else:
+                series_data = pd.read_csv(FILEPATH_SERIE)
+                dossiers_data = pd.read_csv(FILEPATH_DOSSIER)
+        drop_text_index(dbname=dbname_temp,
+                        user=DB_USER, password=db_password,
+                        host=DB_HOST, port=db_port, conn=conn
+                        )
+        try:
+            processing_transkribus(series_data=series_data,
+                                   dossiers_data=dossiers_data,
+                                   dbname=dbname_temp,
+                                   db_user=DB_USER, db_password=db_password,
+                                   db_host=DB_HOST, db_port=db_port,
+                                   correct_line_order=CORRECT_LINE_ORDER
+                                   )
+        finally:
+            create_text_index(dbname=dbname_temp,
+                              user=DB_USER, password=db_password,
+                              host=DB_HOST, port=db_port, conn=conn
+                              )
         logging.info('Transkribus data are processed.')
     elif db_exist:
         # Test if transkribus tables are empty.
-        coll_empty = check_table_empty(dbname=dbname_temp,
-                                       dbtable='transkribus_collection',
-                                       user=DB_USER, password=db_password,
-                                       host=DB_HOST, port=db_port
-                                       )
-        doc_empty = check_table_empty(dbname=dbname_temp,
-                                      dbtable='transkribus_document',
-                                      user=DB_USER, password=db_password,
-                                      host=DB_HOST, port=db_port
-                                      )
-        page_empty = check_table_empty(dbname=dbname_temp,
-                                       dbtable='transkribus_page',
-                                       user=DB_USER, password=db_password,
-                                       host=DB_HOST, port=db_port
-                                       )
-        ts_empty = check_table_empty(dbname=dbname_temp,
-                                     dbtable='transkribus_transcript',
-                                     user=DB_USER, password=db_password,
-                                     host=DB_HOST, port=db_port
-                                     )
-        region_empty = check_table_empty(dbname=dbname_temp,
-                                         dbtable='transkribus_textregion',
-                                         user=DB_USER, password=db_password,
-                                         host=DB_HOST, port=db_port
-                                         )
-        if all((coll_empty, doc_empty, page_empty, ts_empty, region_empty)):
+        if all((tables_empty['transkribus_collection'],
+                tables_empty['transkribus_document'],
+                tables_empty['transkribus_page'],
+                tables_empty['transkribus_transcript'],
+                tables_empty['transkribus_textregion'])):
             # Copy existing transkribus tables from database hgb to database
-            # hgb_temp.
-            conn = psycopg2.connect(dbname=dbname_temp,
-                                    user=DB_USER, password=db_password,
-                                    host=DB_HOST, port=db_port
-                                    )
-            conn.autocommit = True
-            cursor = conn.cursor()
-            cursor.execute(f"""
-            INSERT INTO transkribus_collection
-            SELECT * FROM dblink('{dblink_connname}',
-            'SELECT colid,colname,nrofdocuments FROM transkribus_collection')
-            AS t(colid integer, colname text, nrofdocuments integer)
-            """)
-            cursor.execute(f"""
-            INSERT INTO transkribus_document
-            SELECT * FROM dblink('{dblink_connname}',
-            'SELECT docid,colid,title,nrofpages FROM transkribus_document')
-            AS t(docid integer, colid integer, title text, nrofpages integer)
-            """)
-            cursor.execute(f"""
-            INSERT INTO transkribus_page (pageid, key, docid, pagenr, urlimage)
-            SELECT pageid, key, docid, pagenr, urlimage
-            FROM dblink('{dblink_connname}',
-            'SELECT pageid, key, docid, pagenr, urlimage
-            FROM transkribus_page')
-            AS t(pageid integer, key text, docid integer, pagenr integer,
-            urlimage text)
-            """)
-            cursor.execute(f"""
-            INSERT INTO transkribus_transcript
-            SELECT * FROM dblink('{dblink_connname}',
-            'SELECT key,tsid,pageid,parenttsid,urlpagexml,status,timestamp,
-            htrmodel FROM transkribus_transcript')
-            AS t(key text, tsid integer, pageid integer, parenttsid integer,
-            urlpagexml text, status text, timestamp timestamp, htrmodel text)
-            """)
-            cursor.execute(f"""
-            INSERT INTO transkribus_textregion
-            SELECT * FROM dblink('{dblink_connname}',
-            'SELECT textregionid,key,index,type,textline,text
-            FROM transkribus_textregion')
-            AS t(textregionid text, key text, index integer, type text,
-            textline text[], text text)
-            """)
-            conn.close()
+            # hgb_temp. The tables are copied in one transaction.
+            drop_text_index(dbname=dbname_temp,
+                            user=DB_USER, password=db_password,
+                            host=DB_HOST, port=db_port, conn=conn
+                            )
+            try:
+                copy_table(conn_source, conn, 'transkribus_collection',
+                           ['colid', 'colname', 'nrofdocuments'])
+                copy_table(conn_source, conn, 'transkribus_document',
+                           ['docid', 'colid', 'title', 'nrofpages'])
+                copy_table(conn_source, conn, 'transkribus_page',
+                           ['pageid', 'key', 'docid', 'pagenr', 'urlimage'])
+                copy_table(conn_source, conn, 'transkribus_transcript',
+                           ['key', 'tsid', 'pageid', 'parenttsid',
+                            'urlpagexml', 'status', 'timestamp', 'htrmodel'])
+                copy_table(conn_source, conn, 'transkribus_textregion',
+                           ['textregionid', 'key', 'index', 'type',
+                            'textline', 'text'])
+                conn.commit()
+            finally:
+                # Discard a failed copy before recreating the index.
+                conn.rollback()
+                create_text_index(dbname=dbname_temp,
+                                  user=DB_USER, password=db_password,
+                                  host=DB_HOST, port=db_port, conn=conn
+                                  )
             logging.info('Transkribus data are copied from current database.')
         else:
             logging.warning(
@@ -1856,22 +1985,13 @@ def main():
     processing_geodata(
         shapefile_path=SHAPEFILE_PATH, shapefile_epsg=SHAPEFILE_EPSG,
         dbname=dbname_temp, db_password=db_password, db_user=DB_USER,
-        db_host=DB_HOST, db_port=db_port
+        db_host=DB_HOST, db_port=db_port, conn=conn
         )
     logging.info('Geodata are processed.')
 
     # Processing project data.
-    project_dossier_empty = check_table_empty(
-        dbname=dbname_temp, dbtable='project_dossier',
-        user=DB_USER, password=db_password,
-        host=DB_HOST, port=db_port
-        )
-    project_entry_empty = check_table_empty(
-        dbname=dbname_temp, dbtable='project_entry',
-        user=DB_USER, password=db_password,
-        host=DB_HOST, port=db_port
-        )
-    if not all((project_dossier_empty, project_entry_empty)):
+    if not all((tables_empty['project_dossier'],
+                tables_empty['project_entry'])):
         logging.warning(
             f'Project tables are not empty in database {dbname_temp}. '
             f'No project data will be new processed or copied from {DB_NAME}.'
@@ -1895,58 +2015,29 @@ def main():
                 filepath_addressmatchingtype=FILEPATH_ADDRESSMATCHINGTYPE,
                 filepath_projectrelationship=FILEPATH_PROJECT_RELATIONSHIP,
                 filepath_source=FILEPATH_SOURCE,
-                filepath_specialtype=FILEPATH_SPECIALTYPE
+                filepath_specialtype=FILEPATH_SPECIALTYPE,
+                conn=conn
                 )
             logging.info('Project data are processed.')
         elif db_exist:
             # Copy existing project table from database DB_NAME to dbname_temp.
-            conn = psycopg2.connect(dbname=dbname_temp,
-                                    user=DB_USER, password=db_password,
-                                    host=DB_HOST, port=db_port
-                                    )
-            conn.autocommit = True
-            cursor = conn.cursor()
-            cursor.execute(f"""
-            INSERT INTO project_dossier
-            SELECT * FROM dblink('{dblink_connname}',
-            'SELECT dossierid,yearfrom1,yearto1,yearfrom2,yearto2,
-            locationaccuracy,locationorigin,location,
-            locationshifted,locationshiftedorigin,
-            clusterid,addressmatchingtype,specialtype FROM project_dossier')
-            AS t(dossierid text, yearfrom1 integer, yearto1 integer,
-            yearfrom2 integer, yearto2 integer, locationaccuracy text,
-            locationorigin text, location geometry,
-            locationshifted geometry, locationshiftedorigin text,
-            clusterid integer, addressmatchingtype text, specialtype text)
-            """)
-            cursor.execute(f"""
-            INSERT INTO project_entry
-            SELECT * FROM dblink('{dblink_connname}',
-            'SELECT entryid,dossierid,pageid,year,yearsource,comment,
-            manuallycorrected,language,source,sourceorigin,
-            keylatesttranscript FROM project_entry')
-            AS t(entryid text, dossierid text, pageid integer[], year integer,
-            yearsource text, comment text, manuallycorrected boolean,
-            language text, source text, sourceorigin text,
-            keylatesttranscript text[])
-            """)
-            cursor.execute(f"""
-            INSERT INTO project_relationship
-            SELECT * FROM dblink('{dblink_connname}',
-            'SELECT sourcedossierid,targetdossierid FROM project_relationship')
-            AS t(sourcedossierid text, targetdossierid text)
-            """)
-            conn.close()
+            copy_table(conn_source, conn, 'project_dossier',
+                       ['dossierid', 'yearfrom1', 'yearto1', 'yearfrom2',
+                        'yearto2', 'locationaccuracy', 'locationorigin',
+                        'location', 'locationshifted', 'locationshiftedorigin',
+                        'clusterid', 'addressmatchingtype', 'specialtype'])
+            copy_table(conn_source, conn, 'project_entry',
+                       ['entryid', 'dossierid', 'pageid', 'year', 'yearsource',
+                        'comment', 'manuallycorrected', 'language', 'source',
+                        'sourceorigin', 'keylatesttranscript'])
+            copy_table(conn_source, conn, 'project_relationship',
+                       ['sourcedossierid', 'targetdossierid'])
+            conn.commit()
             logging.info('Project data are copied from current database.')
         else:
             logging.warning('No project data will be available in database.')
 
         # Update transkribus_page.entryid.
-        conn = psycopg2.connect(dbname=dbname_temp,
-                                user=DB_USER, password=db_password,
-                                host=DB_HOST, port=db_port
-                                )
-        conn.autocommit = True
         cursor = conn.cursor()
         cursor.execute("""
         UPDATE transkribus_page tp
@@ -1957,14 +2048,19 @@ def main():
         ) AS pe
         WHERE tp.pageid = pe.pageid;
         """)
-        conn.close()
+        conn.commit()
 
     # Create view.
     create_worktable(dbname=dbname_temp,
                      user=DB_USER, password=db_password,
-                     host=DB_HOST, port=db_port
+                     host=DB_HOST, port=db_port, conn=conn
                      )
 
+    # Close the connections before the databases are renamed or copied.
+    conn.close()
+    if db_exist:
+        conn_source.close()
+
     if do_test:
         # Rename the database.
         dbname_test = DB_NAME + '_test'
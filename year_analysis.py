@@ -24,13 +24,21 @@ This module analyses:
 - The first and the last year number within a dossier.
 
 The generated table is exported as a file year_analysis_dossier.csv.
+
+Both files are written by the csv writer of pyarrow: the header names and all
+string values are enclosed in double quotes, booleans are written as
+true/false and missing values as empty fields.
 """
 
 
+import psycopg2
 import pandas as pd
-import math
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from concurrent.futures import ProcessPoolExecutor
 
-from connectDatabase import read_table
+from connectDatabase import read_query, parse_integer_array
 
 
 # Set parameters for postgresql database
@@ -39,6 +47,76 @@ DB_NAME = 'hgb'
 # Filepath for saving the results.
 FILEPATH_ANALYSIS = '.'
 
+# Columns of the entry pages and of the exported entry analysis.
+ENTRY_PAGE_COLUMNS = ['dossierId', 'pageId', 'year', 'yearSource', 'score']
+ENTRY_ANALYSIS_COLUMNS = ['docId', 'pageNr', 'pageId', 'year', 'yearSource',
+                          'hasTextRegion', 'note']
+
+# Notes of the entry analysis.
+NOTE_YEAR_MAY_BE_WRONG = 'Year may be wrong.'
+NOTE_TEXT_BUT_NO_YEAR = 'Has non-empty text region(s) but no year available.'
+NOTE_NO_YEAR = 'No year available.'
+
+
+def compute_scores(year):
+    """Score the years of the entries of a document by their order.
+
+    Each entry is compared with all entries of the document. The comparison
+    matrix is computed once and reused for all scores, as the entries being
+    larger after an entry are the transposed of those being smaller before.
+    Missing years are never smaller or larger than another year.
+
+    Args:
+        year (ndarray): Years of the entries ordered by page number.
+
+    Returns:
+        ndarray: Score per entry, a score larger than 0 indicates a potential
+        wrong year.
+    """
+    n_entries = len(year)
+
+    # Detect potential wrong years by pairwise comparisation. Row index
+    # refers to an entry, column i to the entry compared with.
+    position = np.arange(n_entries)
+    wrong_order = ((position[None, :] < position[:, None])
+                   & (year[:, None] < year[None, :]))
+    score_minus = wrong_order.sum(axis=1)
+    score_plus = wrong_order.sum(axis=0)
+
+    # Remove not relevant scores by pairwise comparisation. Of two entries in
+    # wrong order, the one with the lower cumulated score is decremented.
+    score_cum = score_minus + score_plus
+    score = (score_cum
+             - (wrong_order
+                & (score_cum[None, :] < score_cum[:, None])).sum(axis=0)
+             - (wrong_order
+                & (score_cum[None, :] > score_cum[:, None])).sum(axis=1))
+
+    # Detect cases when subsequent entry of wrong detected entry might be
+    # wrong instead by comparing each entry with its previous entry.
+    subsequent_wrong = np.zeros(n_entries, dtype=bool)
+    subsequent_wrong[1:] = ((score_plus[:-1] > 0)
+                            & (score_minus[1:] > score_minus[:-1])
+                            & (score_minus[1:] >= score_plus[:-1]))
+    return np.where(subsequent_wrong, score_minus, score)
+
+
+def write_csv(df, filepath):
+    """Write a dataframe to a csv file using the csv writer of pyarrow.
+
+    The header names and string values are quoted, booleans are written as
+    true/false.
+
+    Args:
+        df (DataFrame): Dataframe to be written.
+        filepath (str): Filepath of the destination csv.
+
+    Returns:
+        None.
+    """
+    pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False),
+                     filepath)
+
 
 def main():
     # Get parameters of the database.
@@ -47,200 +125,155 @@ def main():
     db_host = input('PostgreSQL host:')
     db_port = input('PostgreSQL database port:')
 
-    # Read necessary database tables.
-    entry = pd.DataFrame(
-        read_table(dbname=DB_NAME, dbtable='project_entry',
-                   user=db_user, password=db_password,
-                   host=db_host, port=db_port),
-        columns=['entryId', 'dossierId', 'pageId',
-                 'year', 'yearSource',
-                 'comment', 'manuallyCorrected'])
-    dossier = pd.DataFrame(
-        read_table(dbname=DB_NAME, dbtable='project_dossier',
-                   user=db_user, password=db_password,
-                   host=db_host, port=db_port),
-        columns=['dossierId', 'yearFrom_stabs', 'yearTo_stabs',
-                 'yearFrom2', 'yearTo2',
-                 'locationAccuracy', 'locationOrigin', 'location'])
-    dossier = dossier.drop(['locationAccuracy', 'locationOrigin', 'location'],
-                           axis=1)
-    document = pd.DataFrame(
-        read_table(dbname=DB_NAME, dbtable='transkribus_document',
-                   user=db_user, password=db_password,
-                   host=db_host, port=db_port),
-        columns=['docId', 'colId', 'title', 'nrOfPages'])
-    page = pd.DataFrame(
-        read_table(dbname=DB_NAME, dbtable='transkribus_page',
-                   user=db_user, password=db_password,
-                   host=db_host, port=db_port),
-        columns=['pageId', 'key', 'docId', 'pageNr', 'urlImage'])
-    transcript = pd.DataFrame(
-        read_table(dbname=DB_NAME, dbtable='transkribus_transcript',
-                   user=db_user, password=db_password,
-                   host=db_host, port=db_port),
-        columns=['key', 'tsId', 'pageId', 'parentTsId', 'urlPageXml', 'status',
-                 'timestamp', 'htrModel'])
-    textregion = pd.DataFrame(
-        read_table(dbname=DB_NAME, dbtable='transkribus_textregion',
-                   user=db_user, password=db_password,
-                   host=db_host, port=db_port),
-        columns=['textRegionId', 'key', 'index', 'type', 'textLine', 'text'])
+    # Read necessary columns of the database tables using one connection.
+    # The integer columns are read with the size of their database type.
+    conn = psycopg2.connect(dbname=DB_NAME, user=db_user,
+                            password=db_password, host=db_host, port=db_port)
+    entry = read_query(
+        'SELECT dossierid, pageid, year, yearsource FROM project_entry',
+        dbname=DB_NAME, user=db_user, password=db_password,
+        host=db_host, port=db_port, conn=conn,
+        names=['dossierId', 'pageId', 'year', 'yearSource'], header=0,
+        dtype={'year': 'float64'},
+        converters={'pageId': parse_integer_array})
+    dossier = read_query(
+        'SELECT dossierid, yearfrom1, yearto1, yearfrom2, yearto2 '
+        'FROM project_dossier',
+        dbname=DB_NAME, user=db_user, password=db_password,
+        host=db_host, port=db_port, conn=conn,
+        names=['dossierId', 'yearFrom_stabs', 'yearTo_stabs',
+               'yearFrom2', 'yearTo2'], header=0)
+    document = read_query(
+        'SELECT docid, title FROM transkribus_document',
+        dbname=DB_NAME, user=db_user, password=db_password,
+        host=db_host, port=db_port, conn=conn,
+        names=['docId', 'title'], header=0, dtype={'docId': 'int32'})
+    page = read_query(
+        'SELECT pageid, docid, pagenr FROM transkribus_page',
+        dbname=DB_NAME, user=db_user, password=db_password,
+        host=db_host, port=db_port, conn=conn,
+        names=['pageId', 'docId', 'pageNr'], header=0,
+        dtype={'pageId': 'int32', 'docId': 'int32'})
+
+    # Determine latest transcript per page.
+    ts_latest = read_query(
+        'SELECT DISTINCT ON (pageid) pageid, key FROM transkribus_transcript '
+        'ORDER BY pageid, timestamp DESC',
+        dbname=DB_NAME, user=db_user, password=db_password,
+        host=db_host, port=db_port, conn=conn,
+        names=['pageId', 'key'], header=0, dtype={'pageId': 'int32'})
+
+    # Only the keys of the transcripts having text regions are needed.
+    textregion_keys = read_query(
+        'SELECT DISTINCT key FROM transkribus_textregion',
+        dbname=DB_NAME, user=db_user, password=db_password,
+        host=db_host, port=db_port, conn=conn,
+        names=['key'], header=0)['key']
+    conn.close()
+
+    # Group the entries by dossier and index the page numbers by page once,
+    # instead of scanning the tables for each document and entry.
+    entry_by_dossier = dict(tuple(entry.groupby('dossierId', sort=False)))
+    page_nr_by_id = page.set_index('pageId')['pageNr']
 
     # Analyze the year numbers per document.
-    entry_analysis = pd.DataFrame(
-        columns=['docId', 'pageNr', 'pageId',
-                 'year', 'yearSource', 'hasTextRegion',
-                 'note']
-        )
-    for doc in document.iterrows():
-        dossier_id = doc[1]['title']
-        doc_entry = entry[entry['dossierId'] == dossier_id].copy()
-
-        if doc_entry.empty:
+    doc_entries = []
+    for doc in document.itertuples(index=False):
+        doc_entry = entry_by_dossier.get(doc.title)
+
+        if doc_entry is None:
             continue
+        doc_entry = doc_entry.copy()
 
         # Order the entries of this document by the page number.
-        doc_entry['pageNr'] = doc_entry.apply(
-            lambda row: page[
-                page['pageId'] == row['pageId'][0]
-                ]['pageNr'].values[0], axis=1
-                )
+        doc_entry['pageNr'] = doc_entry['pageId'].str[0].map(page_nr_by_id)
         doc_entry.sort_values(by='pageNr', inplace=True)
 
-        # Detect potential wrong years by pairwise comparisation.
-        n_entries = len(doc_entry)
-        score_minus = [0] * n_entries
-        score_plus = [0] * n_entries
-        index = 0
-        for row in doc_entry.iterrows():
-            for i in range(n_entries):
-                if i < index and row[1]['year'] < doc_entry.iloc[i]['year']:
-                    score_minus[index] += 1
-                elif i > index and row[1]['year'] > doc_entry.iloc[i]['year']:
-                    score_plus[index] += 1
-            index += 1
-
-        # Remove not relevant scores by pairwise comparisation.
-        score_cum = [x + y for x, y in zip(score_minus, score_plus)]
-        score = score_cum.copy()
-        index = 0
-        for row in doc_entry.iterrows():
-            for i in range(n_entries):
-                if i < index and row[1]['year'] < doc_entry.iloc[i]['year']:
-                    if score_cum[i] < score_cum[index]:
-                        score[i] -= 1
-                    elif score_cum[i] > score_cum[index]:
-                        score[index] -= 1
-            index += 1
-
-        # Detect cases when subsequent entry of wrong detected entry might be
-        # wrong instead.
-        for i in range(1, n_entries):
-            if (score_plus[i - 1] > 0
-                and score_minus[i] > score_minus[i - 1]
-                and score_minus[i] >= score_plus[i - 1]):
-                score[i] = score_minus[i]
-
-        # Iterate over each page per entry.
-        index = 0
-        page_nr_previous = None
-        for row in doc_entry.iterrows():
-            for page_id in row[1]['pageId']:
-                has_tr = False
-                note = None
-
-                # Determine latest transcript of current page.
-                ts = transcript[transcript['pageId'] == page_id]
-                ts_sorted = ts.sort_values(by='timestamp', ascending=False)
-                ts_latest = ts_sorted.iloc[0]
-
-                # Determine if transkripted text is available in the latest
-                # transcript.
-                tr = textregion[textregion['key'] == ts_latest['key']]
-                if len(tr) > 0:
-                    has_tr = True
-                    # Check if a text region is available but no year is
-                    # available.
-                    if math.isnan(row[1]['year']):
-                        note = 'Has non-empty text region(s) but no year '\
-                            'available.'
-                elif math.isnan(row[1]['year']):
-                    note = 'No year available.'
-
-                # Create note if year might be wrong.
-                if score[index] > 0:
-                    note = 'Year may be wrong.'
-
-                # Add new entry to analysis table.
-                page_selected = page[page['pageId'] == page_id]
-                new_entry = {'docId': page_selected['docId'],
-                             'pageNr': page_selected['pageNr'],
-                             'pageId': page_id,
-                             'year': row[1]['year'],
-                             'yearSource': row[1]['yearSource'],
-                             'hasTextRegion': has_tr,
-                             'note': note}
-                entry_analysis = pd.concat([entry_analysis,
-                                            pd.DataFrame(new_entry)
-                                            ], ignore_index=True)
-
-                # Check if the pages are ordered.
-                page_nr = page_selected['pageNr'].values[0]
-                if (page_nr_previous is not None
-                    and page_nr <= page_nr_previous):
-                    print('Analysis may be wrong due to wrong page order: '
-                          f'dossier_id={dossier_id}, '
-                          f'docId={page_selected["docId"].values[0]}, '
-                          f'pageNr={page_nr_previous}, {page_nr}'
-                          )
-                page_nr_previous = page_nr
-            index += 1
+        doc_entries.append(doc_entry)
+
+    # Detect potential wrong years. The documents are independent of each
+    # other, hence they are scored in parallel processes.
+    with ProcessPoolExecutor() as executor:
+        scores = executor.map(
+            compute_scores,
+            [doc_entry['year'].to_numpy(dtype=np.float64)
+             for doc_entry in doc_entries],
+            chunksize=64)
+        for doc_entry, score in zip(doc_entries, scores):
+            doc_entry['score'] = score
+
+    # Create one row per page of the entries, keeping the order of the
+    # documents and the entries.
+    if doc_entries:
+        entry_page = pd.concat(doc_entries, ignore_index=True)
+    else:
+        entry_page = pd.DataFrame(columns=ENTRY_PAGE_COLUMNS)
+
+    # The entries are contained in entry_page now, release the tables
+    # holding them per document.
+    del doc_entries, entry_by_dossier, entry
+    entry_page = entry_page[ENTRY_PAGE_COLUMNS].explode('pageId')
+    entry_page = entry_page.dropna(subset=['pageId']).astype(
+        {'pageId': 'int32', 'year': 'float64'})
+
+    # Determine if transkripted text is available in the latest transcript.
+    ts_latest = ts_latest.assign(
+        hasTextRegion=ts_latest['key'].isin(textregion_keys))
+    entry_page = entry_page.merge(ts_latest[['pageId', 'hasTextRegion']],
+                                  on='pageId', how='left')
+    entry_page['hasTextRegion'] = entry_page['hasTextRegion'].fillna(
+        False).astype(bool)
+    entry_page = entry_page.merge(page[['pageId', 'docId', 'pageNr']],
+                                  on='pageId', how='inner')
+
+    # Create note if no year is available or if the year might be wrong.
+    has_tr = entry_page['hasTextRegion']
+    year_missing = entry_page['year'].isna()
+    entry_page['note'] = np.select(
+        [entry_page['score'] > 0,
+         has_tr & year_missing,
+         ~has_tr & year_missing],
+        [NOTE_YEAR_MAY_BE_WRONG, NOTE_TEXT_BUT_NO_YEAR, NOTE_NO_YEAR],
+        default=None)
+
+    # Check if the pages are ordered within the documents.
+    page_nr_previous = entry_page.groupby('dossierId')['pageNr'].shift()
+    wrong_order = entry_page['pageNr'] <= page_nr_previous
+    for row, page_nr_prev in zip(
+            entry_page[wrong_order].itertuples(index=False),
+            page_nr_previous[wrong_order]):
+        print('Analysis may be wrong due to wrong page order: '
+              f'dossier_id={row.dossierId}, '
+              f'docId={row.docId}, '
+              f'pageNr={int(page_nr_prev)}, {row.pageNr}'
+              )
+
+    entry_analysis = entry_page[ENTRY_ANALYSIS_COLUMNS]
 
     # Export the results.
-    entry_analysis.to_csv(FILEPATH_ANALYSIS + '/year_analysis_entry.csv',
-                          index=False, header=True)
-
-    # Analyze the time period for each HGB dossier.
-    dossier['yearFrom_entryMin'] = None
-    dossier['yearTo_entryMax'] = None
-    dossier['yearFrom_entryFirst'] = None
-    dossier['yearTo_entryLast'] = None
-    for index, row in dossier.iterrows():
-        dossier_id = document[
-            document['title'] == row['dossierId']]['docId']
-        if not dossier_id.empty:
-            dossier_id = dossier_id.item()
-        else:
-            continue
-
-        # Determine yearFrom and yearTo based on the minimal and maximal
-        # value from project_entry.
-        dossier_entry = entry_analysis[entry_analysis['docId'] == dossier_id]
-        if dossier_entry.empty:
-            continue
-        if not math.isnan(dossier_entry['year'].min()):
-            dossier.at[index,
-                       'yearFrom_entryMin'
-                       ] = int(dossier_entry['year'].min())
-        if not math.isnan(dossier_entry['year'].max()):
-            dossier.at[index,
-                       'yearTo_entryMax'
-                       ] = int(dossier_entry['year'].max())
-
-        # Determine yearFrom and yearTo based on the first and last value from
-        # project_entry.
-        if not math.isnan(dossier_entry['year'].iloc[0]):
-            dossier.at[index,
-                       'yearFrom_entryFirst'
-                       ] = int(dossier_entry['year'].iloc[0])
-        if not math.isnan(dossier_entry['year'].iloc[-1]):
-            dossier.at[index,
-                       'yearTo_entryLast'
-                       ] = int(dossier_entry['year'].iloc[-1])
+    write_csv(entry_analysis, FILEPATH_ANALYSIS + '/year_analysis_entry.csv')
+
+    # Analyze the time period for each HGB dossier. Determine yearFrom and
+    # yearTo based on the minimal and maximal value as well as on the first
+    # and last value from project_entry. The first and last value are taken
+    # as they are, even if no year is available for them.
+    year_by_doc = entry_analysis.groupby('docId', sort=False)['year']
+    year_stats = pd.DataFrame({
+        'yearFrom_entryMin': year_by_doc.min(),
+        'yearTo_entryMax': year_by_doc.max(),
+        'yearFrom_entryFirst': entry_analysis.drop_duplicates(
+            'docId', keep='first').set_index('docId')['year'],
+        'yearTo_entryLast': entry_analysis.drop_duplicates(
+            'docId', keep='last').set_index('docId')['year']
+        }).astype('Int64')
+
+    # Assign the time periods to the dossiers via the document titles.
+    year_stats.index = year_stats.index.map(
+        document.set_index('docId')['title'])
+    dossier = dossier.join(year_stats, on='dossierId')
 
     # Export the results.
-    dossier.to_csv(FILEPATH_ANALYSIS + '/year_analysis_dossier.csv',
-                   index=False, header=True)
+    write_csv(dossier, FILEPATH_ANALYSIS + '/year_analysis_dossier.csv')
 
 
 if __name__ == "__main__":